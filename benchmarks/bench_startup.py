@@ -0,0 +1,77 @@
+"""Cold-start cost: package import time and time to first paint of the main window.
+
+Each run is a fresh interpreter with an empty config directory, so nothing is
+shared between runs. Time to first paint needs a display and is skipped
+without one. Pass --max-import-ms / --max-paint-ms to fail on regressions.
+
+    python benchmarks/bench_startup.py [--runs 5] [--max-import-ms 150]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import streamsniper.app
+print((time.perf_counter() - start) * 1000, "yt_dlp" in sys.modules)
+"""
+
+_PAINT_SCRIPT = """
+import time
+start = time.perf_counter()
+from streamsniper.app import StreamSniperApp
+app = StreamSniperApp()
+app.root.wait_visibility()
+app.root.update_idletasks()
+print((time.perf_counter() - start) * 1000)
+app.root.destroy()
+"""
+
+
+def _run(script: str) -> str:
+    with tempfile.TemporaryDirectory() as config_home:
+        env = dict(os.environ, XDG_CONFIG_HOME=config_home, PYTHONPATH=ROOT)
+        result = subprocess.run([sys.executable, "-c", script], env=env, cwd=ROOT,
+                                capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0)
+    parser.add_argument("--max-paint-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    _run(_IMPORT_SCRIPT)  # warm the bytecode cache
+    imports, eager = [], False
+    for _ in range(args.runs):
+        ms, loaded = _run(_IMPORT_SCRIPT)
+        imports.append(float(ms))
+        eager = eager or loaded == "True"
+    import_ms = statistics.median(imports)
+    print(f"import   : {import_ms:7.1f} ms median of {args.runs}"
+          f"{'  (yt_dlp imported eagerly)' if eager else ''}")
+
+    paint_ms = None
+    try:
+        paint_ms = statistics.median(float(_run(_PAINT_SCRIPT)[0]) for _ in range(args.runs))
+        print(f"paint    : {paint_ms:7.1f} ms median of {args.runs}")
+    except RuntimeError as e:
+        print(f"paint    : skipped ({e})")
+
+    failed = (args.max_import_ms and import_ms > args.max_import_ms) or \
+        (args.max_paint_ms and paint_ms is not None and paint_ms > args.max_paint_ms)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-task overhead of fresh vs pooled YoutubeDL sessions on a 200-item queue.
+
+Serves a small clip from a local HTTP/1.1 server so the numbers reflect
+session setup and connection handling rather than remote bandwidth.
+
+    python benchmarks/bench_ydl_pool.py [--items 200] [--size-kb 64]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamsniper.downloader import Downloader  # noqa: E402
+from streamsniper.pool import YoutubeDLPool  # noqa: E402
+
+
+def _serve(payload: bytes) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            self._headers()
+
+        def do_GET(self):
+            self._headers()
+            self.wfile.write(payload)
+
+        def _headers(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _run(items: int, base_url: str, pool: YoutubeDLPool) -> float:
+    downloader = Downloader(pool=pool)
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            for i in range(items):
+                downloader.download(f"{base_url}/clip{i}.mp4", out_dir)
+        elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    server = _serve(os.urandom(args.size_kb * 1024))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    _run(5, base_url, YoutubeDLPool())
+
+    fresh = _run(args.items, base_url, YoutubeDLPool(max_idle=0))
+    pooled = _run(args.items, base_url, YoutubeDLPool())
+    server.shutdown()
+
+    per_fresh = fresh / args.items * 1000
+    per_pooled = pooled / args.items * 1000
+    print(f"items={args.items} size={args.size_kb}KB")
+    print(f"fresh  : {fresh:7.2f}s total  {per_fresh:7.2f} ms/task")
+    print(f"pooled : {pooled:7.2f}s total  {per_pooled:7.2f} ms/task")
+    print(f"saved  : {per_fresh - per_pooled:7.2f} ms/task ({(1 - pooled / fresh) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 import subprocess
 import sys
+import threading
 import tkinter as tk
 from tkinter import ttk
 
 from . import __version__, theme
+from .archive import DownloadArchive, warm_extractors
+from .cache import ExtractionCache
 from .config import Config, DownloadHistory
-from .downloader import DownloadManager, DownloadProgress, QueueItem
+from .downloader import DownloadManager
+from .events import ProgressChannel
+from .journal import QueueJournal
 from .tabs.download_tab import DownloadTab
 from .tabs.history_tab import HistoryTab
 from .tabs.settings_tab import SettingsTab
@@ -23,6 +28,17 @@ def _notify_macos(title: str, message: str):
         pass
 
 
+def _warm_imports():
+    # yt_dlp and PIL take a noticeable fraction of a second to import; load them
+    # off the UI thread after the window is up so the first extraction doesn't pay for it.
+    import yt_dlp  # noqa: F401
+    warm_extractors()
+    try:
+        from PIL import Image, ImageTk  # noqa: F401
+    except ImportError:
+        pass
+
+
 class StreamSniperApp:
     def __init__(self):
         self.root = tk.Tk()
@@ -30,8 +46,23 @@ class StreamSniperApp:
         self.root.configure(bg=theme.BG_DARK)
 
         self.config = Config()
-        self.history = DownloadHistory()
-        self.dm = DownloadManager()
+        self.history = DownloadHistory(load_async=True)
+        self.cache = ExtractionCache(
+            ttl=self.config.get("extract_cache_ttl"),
+            max_entries=self.config.get("extract_cache_max_entries"),
+        )
+        self.dm = DownloadManager(
+            max_workers=self.config.get("max_concurrent_downloads"),
+            max_per_host=self.config.get("max_downloads_per_host"),
+            cache=self.cache,
+            max_backlog=self.config.get("max_queued_tasks"),
+            lookahead=self.config.get("lookahead_depth"),
+            postprocess_workers=self.config.get("postprocess_workers"),
+            retention=self.config.get("queue_retention"),
+            journal=QueueJournal(),
+            archive=DownloadArchive(),
+            max_retries=self.config.get("download_retries"),
+        )
 
         geo = self.config.get("window_geometry")
         self.root.geometry(geo)
@@ -40,9 +71,21 @@ class StreamSniperApp:
         theme.configure_ttk_styles()
         self._build_ui()
         self._bind_download_manager()
+        # Replaying the journal works out video keys from URLs, which needs yt-dlp's
+        # extractors, and the archive backfills from history once that has loaded;
+        # keep both off the UI thread.
+        threading.Thread(target=self._restore, name="restore", daemon=True).start()
+        self._pump_progress()
+        self.root.after_idle(
+            lambda: threading.Thread(target=_warm_imports, name="warm-imports", daemon=True).start())
 
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
+    def _restore(self):
+        self.history.wait_ready()
+        self.dm.archive.load()
+        self.dm.restore()
+
     def _build_ui(self):
         self.gradient = GradientFrame(self.root)
         self.gradient.place(relwidth=1, relheight=1)
@@ -51,19 +94,26 @@ class StreamSniperApp:
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
 
         self.download_tab = DownloadTab(self.notebook, self.config, self.history, self.dm)
-        self.history_tab = HistoryTab(self.notebook, self.history)
-        self.settings_tab = SettingsTab(self.notebook, self.config)
+        self.history_tab: HistoryTab | None = None
+        self.settings_tab: SettingsTab | None = None
 
+        # History and Settings are built the first time they are shown.
         self.notebook.add(self.download_tab, text="  Download  ")
-        self.notebook.add(self.history_tab, text="  History  ")
-        self.notebook.add(self.settings_tab, text="  Settings  ")
+        self.notebook.add(ttk.Frame(self.notebook, style="TFrame"), text="  History  ")
+        self.notebook.add(ttk.Frame(self.notebook, style="TFrame"), text="  Settings  ")
+        self._lazy_tabs = {1: self._build_history_tab, 2: self._build_settings_tab}
 
         self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
 
-    def _bind_download_manager(self):
-        def on_progress(task_id: str, progress: DownloadProgress):
-            self.root.after(0, self.download_tab.on_progress, task_id, progress)
+    def _build_history_tab(self, frame: ttk.Frame):
+        self.history_tab = HistoryTab(frame, self.history, self.dm.archive)
+        self.history_tab.pack(fill=tk.BOTH, expand=True)
 
+    def _build_settings_tab(self, frame: ttk.Frame):
+        self.settings_tab = SettingsTab(frame, self.config, self.dm)
+        self.settings_tab.pack(fill=tk.BOTH, expand=True)
+
+    def _bind_download_manager(self):
         def on_complete(task_id: str, filepath: str, meta: dict):
             def _handle():
                 self.download_tab.on_complete(task_id, filepath, meta)
@@ -74,22 +124,39 @@ class StreamSniperApp:
         def on_error(task_id: str, error: str):
             self.root.after(0, self.download_tab.on_error, task_id, error)
 
-        def on_queue_update(items: list[QueueItem]):
-            self.root.after(0, self.download_tab.on_queue_update, items)
+        def on_playlist_progress(playlist_id: str, count: int, skipped: int, done: bool):
+            self.root.after(0, self.download_tab.on_playlist_progress, playlist_id, count,
+                            skipped, done)
 
-        self.dm.on_progress = on_progress
+        self.progress_channel = ProgressChannel()
+        self.dm.on_progress = self.progress_channel.publish
         self.dm.on_complete = on_complete
         self.dm.on_error = on_error
-        self.dm.on_queue_update = on_queue_update
+        self.dm.on_queue_change = self.progress_channel.post
+        self.dm.on_playlist_progress = on_playlist_progress
+
+    def _pump_progress(self):
+        queue_events = self.progress_channel.drain_queue_events()
+        if queue_events:
+            self.download_tab.on_queue_events(queue_events)
+        for task_id, progress in self.progress_channel.drain():
+            self.download_tab.on_progress(task_id, progress)
+        interval = max(1, 1000 // max(1, self.config.get("progress_update_hz")))
+        self.root.after(interval, self._pump_progress)
 
     def _on_tab_change(self, event):
         idx = self.notebook.index(self.notebook.select())
-        if idx == 1:
+        build = self._lazy_tabs.pop(idx, None)
+        if build:
+            build(self.notebook.nametowidget(self.notebook.select()))
+        elif idx == 1:
             self.history_tab.reload()
 
     def _on_close(self):
         geo = self.root.geometry().split("+")[0]
         self.config.set("window_geometry", geo)
+        self.config.flush()
+        self.dm.shutdown()
         self.root.destroy()
 
     def run(self):
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from .cache import normalize_url
+from .config import _config_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    key TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+# Extractor classes that have matched URLs on a host, tried before a full scan.
+# Misses aren't cached: whether a URL matches depends on its path, not just its host.
+_host_extractors: dict[str, list] = {}
+_extractors: Optional[list] = None
+
+
+def _extractor_classes() -> list:
+    global _extractors
+    if _extractors is None:
+        from yt_dlp.extractor import gen_extractor_classes
+
+        # Generic matches everything and its ids are not stable across URLs.
+        _extractors = [ie for ie in gen_extractor_classes() if ie.ie_key() != "Generic"]
+    return _extractors
+
+
+def warm_extractors():
+    # Importing the extractors and compiling their URL patterns takes most of a
+    # second; the first url_video_key call pays for it unless this ran first.
+    for ie in _extractor_classes():
+        ie.suitable("")
+
+
+def url_video_key(url: str) -> Optional[str]:
+    # "extractor id" for a URL, worked out from the extractor URL patterns alone;
+    # None when no extractor claims the URL or its id isn't part of the URL.
+    host = urlparse(url).netloc.lower()
+    ie = next((ie for ie in _host_extractors.get(host, ()) if ie.suitable(url)), None)
+    if ie is None:
+        extractors = _extractor_classes()
+        ie = next((ie for ie in extractors if ie.suitable(url)), None)
+        if ie is not None:
+            # Replaced rather than appended to, so other threads never see it mid-sort.
+            _host_extractors[host] = sorted([*_host_extractors.get(host, ()), ie],
+                                            key=extractors.index)
+    if ie is None:
+        return None
+    try:
+        video_id = ie.get_temp_id(url)
+    except Exception:
+        return None
+    return f"{ie.ie_key().lower()} {video_id}" if video_id else None
+
+
+def archive_keys(url: str = "", video_key: Optional[str] = None) -> list[str]:
+    # A video is archived under its "extractor id" when it has one, so every URL for
+    # it matches, and under its normalized URL only as a fallback. A history entry
+    # records both, so deleting it can always find the key again.
+    # Generic ids come from file names, so they would collide across sites.
+    if video_key and not video_key.startswith("generic "):
+        return [video_key]
+    return [normalize_url(url)] if url else []
+
+
+class DownloadArchive:
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path or _config_dir() / "history.db"
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._keys: Optional[set[str]] = None
+
+    def _open(self):
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'archive'").fetchone()
+        self._db.executescript(_SCHEMA)
+        if not exists:
+            self._backfill()
+
+    def _backfill(self):
+        has_history = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'history'").fetchone()
+        if not has_history:
+            return
+        keys = set()
+        for url, extractor, video_id in self._db.execute(
+                "SELECT url, extractor, video_id FROM history"):
+            video_key = f"{extractor.lower()} {video_id}" if extractor and video_id else None
+            keys.update(archive_keys(url, video_key))
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO archive (key) VALUES (?)",
+                                 [(k,) for k in keys])
+
+    def _loaded(self) -> set[str]:
+        # Callers hold the lock. The archive is opened (and backfilled from history the
+        # first time) and its keys read on first use, so startup doesn't pay for it.
+        if self._keys is None:
+            self._open()
+            self._keys = {row[0] for row in self._db.execute("SELECT key FROM archive")}
+        return self._keys
+
+    def load(self):
+        with self._lock:
+            self._loaded()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._loaded())
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._loaded()
+
+    def known(self, keys: Iterable[str]) -> bool:
+        with self._lock:
+            loaded = self._loaded()
+            return any(k in loaded for k in keys)
+
+    def add(self, keys: Iterable[str]):
+        with self._lock:
+            new = [k for k in keys if k and k not in self._loaded()]
+            if not new:
+                return
+            with self._db:
+                self._db.executemany("INSERT OR IGNORE INTO archive (key) VALUES (?)",
+                                     [(k,) for k in new])
+            self._keys.update(new)
+
+    def discard(self, keys: Iterable[str]):
+        keys = list(keys)
+        with self._lock:
+            loaded = self._loaded()
+            with self._db:
+                self._db.executemany("DELETE FROM archive WHERE key = ?", [(k,) for k in keys])
+            loaded.difference_update(keys)
+
+    def clear(self):
+        with self._lock:
+            self._loaded()
+            with self._db:
+                self._db.execute("DELETE FROM archive")
+            self._keys = set()
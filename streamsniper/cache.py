@@ -0,0 +1,164 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from .config import _config_dir
+
+_TRACKING_PARAMS = {"si", "feature", "pp", "ab_channel", "utm_source", "utm_medium",
+                    "utm_campaign", "utm_term", "utm_content"}
+_EXPIRE_RE = re.compile(r"[?&/]expires?[=/](\d{9,11})", re.IGNORECASE)
+_EXPIRY_MARGIN = 10 * 60
+# Access times are written in batches; losing a batch only makes eviction less exact.
+_TOUCH_BATCH = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+"""
+
+
+def normalize_url(url: str) -> str:
+    parts = urlparse(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k not in _TRACKING_PARAMS)
+    path = parts.path.rstrip("/") or "/"
+    return urlunparse(("https" if parts.scheme in ("http", "https") else parts.scheme,
+                       netloc, path, "", urlencode(query), ""))
+
+
+def video_key(info: dict) -> Optional[str]:
+    extractor = info.get("extractor_key") or info.get("ie_key")
+    video_id = info.get("id")
+    if not extractor or not video_id:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+
+def stream_expiry(info: dict) -> Optional[float]:
+    expiries = []
+    for f in (info.get("formats") or []) + (info.get("requested_formats") or []):
+        m = _EXPIRE_RE.search(f.get("url") or "")
+        if m:
+            expiries.append(int(m.group(1)))
+    return min(expiries) if expiries else None
+
+
+def is_expired(info: dict, margin: float = _EXPIRY_MARGIN) -> bool:
+    expires = stream_expiry(info)
+    return expires is not None and expires - margin <= time.time()
+
+
+class ExtractionCache:
+    def __init__(self, path: Optional[Path] = None, ttl: float = 6 * 3600,
+                 max_entries: int = 2000):
+        self._path = path or _config_dir() / "extract_cache.db"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._touched: dict[str, float] = {}
+
+    def get(self, url: str, key: Optional[str] = None) -> Optional[dict]:
+        # key is the "extractor id" when known, so youtu.be/X finds what watch?v=X stored.
+        aliases = (normalize_url(url), key) if key else (normalize_url(url),)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT e.key, e.info, e.expires FROM aliases a JOIN entries e ON e.key = a.key "
+                f"WHERE a.alias IN ({', '.join('?' * len(aliases))}) LIMIT 1", aliases).fetchone()
+            if row is None or row[2] <= now:
+                if row is not None:
+                    self._delete(row[0])
+                self.misses += 1
+                return None
+            self._touched[row[0]] = now
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+            self.hits += 1
+        return json.loads(row[1])
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                                 [(t, k) for k, t in self._touched.items()])
+            self._db.commit()
+            self._touched = {}
+
+    def put(self, url: str, info: dict):
+        now = time.time()
+        expires = now + self.ttl
+        stream_expires = stream_expiry(info)
+        if stream_expires is not None:
+            expires = min(expires, stream_expires - _EXPIRY_MARGIN)
+        if expires <= now:
+            return
+        key = video_key(info) or normalize_url(url)
+        aliases = {key, normalize_url(url)}
+        for name in ("webpage_url", "original_url"):
+            if info.get(name):
+                aliases.add(normalize_url(info[name]))
+        data = json.dumps(info, default=str)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, info, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, expires, now))
+            self._db.executemany("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)",
+                                 [(alias, key) for alias in aliases])
+            self._flush_touched()
+            self._evict()
+            self._db.commit()
+
+    def invalidate(self, url: str):
+        alias = normalize_url(url)
+        with self._lock:
+            row = self._db.execute("SELECT key FROM aliases WHERE alias = ?", (alias,)).fetchone()
+            if row:
+                self._delete(row[0])
+
+    def _delete(self, key: str):
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._db.execute("DELETE FROM aliases WHERE key = ?", (key,))
+        self._db.commit()
+
+    def _evict(self):
+        removed = self._db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),)).rowcount
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            removed += self._db.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)).rowcount
+        if removed:
+            self._db.execute("DELETE FROM aliases WHERE key NOT IN (SELECT key FROM entries)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM aliases")
+            self._db.commit()
+            self._touched = {}
@@ -0,0 +1,202 @@
+import argparse
+import contextlib
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from . import __version__
+from .archive import DownloadArchive
+from .cache import ExtractionCache
+from .config import Config, DownloadHistory
+from .downloader import DownloadManager, DownloadState, QueueChange
+from .events import ProgressChannel, progress_fields
+from .journal import QueueJournal
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class _Emitter:
+    def __init__(self, stream=None):
+        self._stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event: str, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+def _read_urls(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith("#"):
+            yield url
+
+
+def build_manager(config: Config, max_workers: int, max_per_host: int,
+                  journal: Optional[QueueJournal] = None,
+                  archive: Optional[DownloadArchive] = None) -> DownloadManager:
+    return DownloadManager(
+        max_workers=max_workers,
+        max_per_host=max_per_host,
+        cache=ExtractionCache(ttl=config.get("extract_cache_ttl"),
+                              max_entries=config.get("extract_cache_max_entries")),
+        max_backlog=config.get("max_queued_tasks"),
+        lookahead=config.get("lookahead_depth"),
+        postprocess_workers=config.get("postprocess_workers"),
+        retention=config.get("queue_retention"),
+        journal=journal,
+        archive=archive,
+        max_retries=config.get("download_retries"),
+    )
+
+
+def build_parser(config: Config) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="streamsniper",
+        description="Download videos and audio without the GUI. Progress is written to "
+                    "stdout as one JSON object per line.")
+    parser.add_argument("urls", nargs="*", metavar="URL")
+    parser.add_argument("-a", "--batch-file", metavar="FILE",
+                        help="read URLs from FILE, one per line ('-' for stdin)")
+    parser.add_argument("-o", "--output-dir", default=config.get("download_dir"))
+    parser.add_argument("-f", "--format", choices=("video", "audio"), default=config.get("format"))
+    parser.add_argument("-q", "--quality", default=config.get("quality"),
+                        help="best, 1080p, 720p or 480p")
+    parser.add_argument("--audio-format", default=config.get("audio_format"))
+    parser.add_argument("--embed-thumbnail", action=argparse.BooleanOptionalAction,
+                        default=config.get("embed_thumbnail"))
+    parser.add_argument("--sponsorblock", action=argparse.BooleanOptionalAction,
+                        default=config.get("sponsorblock"))
+    parser.add_argument("--playlist", action="store_true",
+                        help="expand playlist URLs into one task per entry")
+    parser.add_argument("-j", "--jobs", type=int, default=config.get("max_concurrent_downloads"))
+    parser.add_argument("--per-host", type=int, default=config.get("max_downloads_per_host"))
+    parser.add_argument("--no-history", action="store_true",
+                        help="don't record finished downloads in the history")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="download videos even if they were downloaded before")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    config = Config()
+    parser = build_parser(config)
+    args = parser.parse_args(argv)
+
+    sources: list[Iterable[str]] = [args.urls]
+    if args.batch_file == "-" or (args.batch_file is None and not args.urls
+                                  and not sys.stdin.isatty()):
+        sources.append(_read_urls(sys.stdin))
+    elif args.batch_file:
+        try:
+            with open(args.batch_file) as f:
+                sources.append(list(_read_urls(f)))
+        except OSError as e:
+            parser.error(f"cannot read batch file: {e}")
+    if not args.urls and len(sources) == 1:
+        parser.error("no URLs given")
+
+    # yt-dlp prints its own progress on stdout; keep stdout for JSON lines only.
+    emit = _Emitter(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        return _run(config, args, sources, emit)
+
+
+def _run(config: Config, args: argparse.Namespace, sources: list[Iterable[str]],
+         emit: _Emitter) -> int:
+    history = None if args.no_history else DownloadHistory()
+    channel = ProgressChannel()
+    dm = build_manager(config, args.jobs, args.per_host,
+                       archive=None if args.no_archive else DownloadArchive())
+    # Completions and errors are emitted from the pump, after any progress
+    # snapshots for the same task, so lines for a task never arrive out of order.
+    results: queue.SimpleQueue = queue.SimpleQueue()
+
+    def on_complete(task_id: str, path: str, meta: dict):
+        results.put(("complete", dict(task_id=task_id, path=path, **meta)))
+        if history:
+            history.add(url=meta["url"], title=meta["title"], filename=path.rsplit("/", 1)[-1],
+                        path=path, fmt=meta["format"], quality=meta["quality"],
+                        filesize_mb=meta["filesize_mb"], duration=meta["duration"],
+                        uploader=meta["uploader"], extractor=meta["extractor"],
+                        video_id=meta["video_id"])
+
+    def on_error(task_id: str, error: str):
+        results.put(("error", dict(task_id=task_id, error=error)))
+
+    def on_queue_change(event):
+        if event.change is QueueChange.ADDED:
+            emit("queued", task_id=event.item.task_id, url=event.item.url)
+
+    def on_playlist_progress(playlist_id: str, count: int, skipped: int, done: bool):
+        emit("playlist", playlist_id=playlist_id, queued=count, skipped=skipped, done=done)
+
+    dm.on_progress = channel.publish
+    dm.on_complete = on_complete
+    dm.on_error = on_error
+    dm.on_queue_change = on_queue_change
+    dm.on_playlist_progress = on_playlist_progress
+
+    options = dict(output_dir=args.output_dir, fmt=args.format, quality=args.quality,
+                   audio_format=args.audio_format, embed_thumbnail=args.embed_thumbnail,
+                   sponsorblock=args.sponsorblock)
+    feeding = threading.Event()
+    feeding.set()
+
+    def feed():
+        try:
+            for source in sources:
+                for url in source:
+                    if args.playlist:
+                        dm.enqueue_playlist(url, **options)
+                    elif dm.enqueue(url, **options) is None:
+                        emit("skipped", url=url, reason="archived")
+        finally:
+            feeding.clear()
+
+    # URLs streamed on stdin are queued as they arrive, not after EOF.
+    threading.Thread(target=feed, name="cli-feed", daemon=True).start()
+
+    failures = cancelled = 0
+    interval = 1 / max(1, config.get("progress_update_hz"))
+
+    def pump():
+        nonlocal failures, cancelled
+        for task_id, p in channel.drain():
+            if p.state is DownloadState.CANCELLED:
+                cancelled += 1
+            if p.state in (DownloadState.COMPLETE, DownloadState.ERROR):
+                continue  # reported by on_complete / on_error with full details
+            emit("progress", task_id=task_id, **progress_fields(p))
+        while not results.empty():
+            event, fields = results.get()
+            failures += event == "error"
+            emit(event, **fields)
+
+    try:
+        while feeding.is_set() or not dm.is_idle():
+            pump()
+            time.sleep(interval)
+        pump()
+    except KeyboardInterrupt:
+        dm.cancel_active()
+        dm.shutdown()
+        pump()
+        return EXIT_INTERRUPTED
+    finally:
+        config.flush()
+    dm.shutdown()
+    return EXIT_FAILED if failures or cancelled else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
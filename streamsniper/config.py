@@ -1,8 +1,11 @@
 import json
 import os
+import sqlite3
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Optional
 
 
 def _config_dir() -> Path:
@@ -24,14 +27,34 @@ DEFAULTS = {
     "audio_format": "mp3",
     "embed_thumbnail": True,
     "sponsorblock": False,
+    "max_concurrent_downloads": 3,
+    "max_downloads_per_host": 2,
+    "download_retries": 5,
+    "max_queued_tasks": 200,
+    "lookahead_depth": 3,
+    "postprocess_workers": 0,
+    "progress_update_hz": 10,
+    "queue_retention": 200,
+    "extract_cache_ttl": 6 * 3600,
+    "extract_cache_max_entries": 2000,
+    "api_port": 8766,
     "window_geometry": "900x620",
 }
 
 
+_SAVE_DELAY = 0.5
+
+
 class Config:
-    def __init__(self):
+    def __init__(self, save_delay: float = _SAVE_DELAY):
         self._path = _config_dir() / "config.json"
         self._data = dict(DEFAULTS)
+        self._save_delay = save_delay
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._subscribers: dict[str, list[Callable]] = {}
         self._load()
 
     def _load(self):
@@ -43,68 +66,290 @@ class Config:
             except (json.JSONDecodeError, OSError):
                 pass
 
-    def _save(self):
-        with open(self._path, "w") as f:
-            json.dump(self._data, f, indent=2)
+    def _schedule_save(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self._save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        # The snapshot is taken under _save_lock too, so a timer flush holding older
+        # data can never write after a newer flush.
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                data = dict(self._data)
+            # Write a sibling temp file and rename it over the old one, so a crash
+            # mid-write never leaves a truncated config.json behind.
+            tmp = self._path.with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
 
     def get(self, key: str):
         return self._data.get(key, DEFAULTS.get(key))
 
     def set(self, key: str, value):
-        self._data[key] = value
-        self._save()
+        with self._lock:
+            if key in self._data and self._data[key] == value:
+                return
+            self._data[key] = value
+        self._schedule_save()
+        self._notify(key, value)
 
     def reset(self):
-        self._data = dict(DEFAULTS)
-        self._save()
+        with self._lock:
+            old, self._data = self._data, dict(DEFAULTS)
+        self._schedule_save()
+        for key, value in DEFAULTS.items():
+            if old.get(key) != value:
+                self._notify(key, value)
+
+    def subscribe(self, key: str, callback: Callable[[object], None]) -> Callable[[], None]:
+        self._subscribers.setdefault(key, []).append(callback)
+        return lambda: self._subscribers[key].remove(callback)
+
+    def _notify(self, key: str, value):
+        for callback in list(self._subscribers.get(key, ())):
+            callback(value)
+
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    uploader TEXT NOT NULL DEFAULT '',
+    filename TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL DEFAULT '',
+    format TEXT NOT NULL DEFAULT '',
+    quality TEXT NOT NULL DEFAULT '',
+    filesize_mb REAL NOT NULL DEFAULT 0,
+    duration TEXT NOT NULL DEFAULT '',
+    extractor TEXT NOT NULL DEFAULT '',
+    video_id TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_url ON history (url);
+CREATE INDEX IF NOT EXISTS history_video_id ON history (video_id, extractor);
+CREATE TABLE IF NOT EXISTS history_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Let a listing in any sort order stop after a page instead of sorting every row.
+_SORT_INDEXES = """
+CREATE INDEX IF NOT EXISTS history_title ON history (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS history_format ON history (format);
+CREATE INDEX IF NOT EXISTS history_size ON history (filesize_mb);
+CREATE INDEX IF NOT EXISTS history_path ON history (path COLLATE NOCASE);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    title, uploader, url, path, content='history', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, title, uploader, url, path)
+    VALUES (new.id, new.title, new.uploader, new.url, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, title, uploader, url, path)
+    VALUES ('delete', old.id, old.title, old.uploader, old.url, old.path);
+END;
+"""
+
+_NEWEST_FIRST = "ORDER BY timestamp DESC, id DESC"
+_SEARCH_FIELDS = ("title", "uploader", "url", "path")
+_TRIGRAM = 3
+# Past this many index matches, walking the sort index and testing each row finds
+# a page sooner than collecting every match and sorting them.
+_DENSE_MATCHES = 5000
+# Columns the history can be listed by; the id breaks ties so pages never overlap.
+_SORT_COLUMNS = {
+    "date": "timestamp",
+    "title": "title COLLATE NOCASE",
+    "format": "format",
+    "size": "filesize_mb",
+    "path": "path COLLATE NOCASE",
+}
+
+
+def _phrase(q: str) -> str:
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _order_by(sort: str, descending: bool) -> str:
+    direction = "DESC" if descending else "ASC"
+    return f"ORDER BY {_SORT_COLUMNS[sort]} {direction}, id {direction}"
 
 
 class DownloadHistory:
-    def __init__(self):
-        self._path = _config_dir() / "history.json"
-        self._entries: list[dict] = []
-        self._load()
+    def __init__(self, load_async: bool = False):
+        self._path = _config_dir() / "history.db"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_HISTORY_SCHEMA)
+        self._fts = False
+        self.generation = 0
+        # Building the search index and migrating history.json can take seconds on a
+        # large history; with load_async they run on a thread and every query waits.
+        self._ready = threading.Event()
+        if load_async:
+            threading.Thread(target=self._load, name="history-load", daemon=True).start()
+        else:
+            self._load()
 
     def _load(self):
-        if self._path.exists():
-            try:
-                with open(self._path) as f:
-                    self._entries = json.load(f)
-            except (json.JSONDecodeError, OSError):
-                self._entries = []
+        try:
+            self._db.executescript(_SORT_INDEXES)
+            self._fts = self._create_fts()
+            self._migrate_json(_config_dir() / "history.json")
+        finally:
+            self._ready.set()
 
-    def _save(self):
-        with open(self._path, "w") as f:
-            json.dump(self._entries, f, indent=2)
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _create_fts(self) -> bool:
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or the trigram tokenizer; search falls back to LIKE.
+            return False
+        if not exists:
+            with self._db:
+                self._db.execute("INSERT INTO history_fts (history_fts) VALUES ('rebuild')")
+        return True
+
+    def _migrate_json(self, json_path: Path):
+        if not json_path.exists():
+            return
+        migrated = json_path.with_suffix(".json.migrated")
+        if self._db.execute("SELECT 1 FROM history_meta WHERE key = 'json_migrated'").fetchone():
+            # Imported already; the rename below didn't happen before the last exit.
+            json_path.replace(migrated)
+            return
+        try:
+            with open(json_path) as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            # Leave an unreadable file in place rather than discarding it.
+            return
+        rows = [(
+            e.get("url", ""), e.get("title", ""), e.get("uploader", ""), e.get("filename", ""),
+            e.get("path", ""), e.get("format", ""), e.get("quality", ""),
+            e.get("filesize_mb", 0) or 0, e.get("duration", ""),
+            e.get("timestamp") or datetime.now().isoformat(),
+        ) for e in reversed(entries) if isinstance(e, dict)]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO history (url, title, uploader, filename, path, format, quality, "
+                "filesize_mb, duration, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # Committed with the rows, so the import happens at most once.
+            self._db.execute("INSERT INTO history_meta (key, value) VALUES ('json_migrated', ?)",
+                             (datetime.now().isoformat(),))
+            self.generation += 1
+        json_path.replace(migrated)
+
+    def _rows(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
 
     def add(self, url: str, title: str, filename: str, path: str,
-            fmt: str, quality: str, filesize_mb: float, duration: str):
-        self._entries.insert(0, {
-            "url": url,
-            "title": title,
-            "filename": filename,
-            "path": path,
-            "format": fmt,
-            "quality": quality,
-            "filesize_mb": round(filesize_mb, 2),
-            "duration": duration,
-            "timestamp": datetime.now().isoformat(),
-        })
-        self._save()
+            fmt: str, quality: str, filesize_mb: float, duration: str,
+            uploader: str = "", extractor: str = "", video_id: str = "") -> int:
+        self._ready.wait()
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT INTO history (url, title, uploader, filename, path, format, quality, "
+                "filesize_mb, duration, extractor, video_id, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, title, uploader, filename, path, fmt, quality, round(filesize_mb, 2),
+                 duration, extractor, video_id, datetime.now().isoformat()))
+            self.generation += 1
+        return cur.lastrowid
 
     def remove(self, index: int):
-        if 0 <= index < len(self._entries):
-            self._entries.pop(index)
-            self._save()
+        if index < 0:
+            return
+        self._ready.wait()
+        with self._lock, self._db:
+            self._db.execute(
+                f"DELETE FROM history WHERE id = (SELECT id FROM history {_NEWEST_FIRST} "
+                "LIMIT 1 OFFSET ?)", (index,))
+            self.generation += 1
 
-    def search(self, query: str) -> list[dict]:
+    def remove_id(self, entry_id: int):
+        self._ready.wait()
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+            self.generation += 1
+
+    def search(self, query: str, limit: Optional[int] = None, offset: int = 0,
+               sort: str = "date", descending: bool = True) -> list[dict]:
+        # Callers page through the matches; only limit rows are ever read.
+        self._ready.wait()
+        where, params = self._match(query.lower())
+        return self._rows(
+            f"SELECT * FROM history WHERE {where} {_order_by(sort, descending)} LIMIT ? OFFSET ?",
+            params + (-1 if limit is None else limit, offset))
+
+    def count(self, query: str = "") -> int:
+        self._ready.wait()
         q = query.lower()
-        return [e for e in self._entries if q in e.get("title", "").lower()
-                or q in e.get("url", "").lower()]
+        if self._fts and len(q) >= _TRIGRAM:
+            sql, params = "SELECT count(*) FROM history_fts WHERE history_fts MATCH ?", (_phrase(q),)
+        else:
+            where, params = self._match(q)
+            sql = f"SELECT count(*) FROM history WHERE {where}"
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    def _match(self, q: str) -> tuple[str, tuple]:
+        if not q:
+            return "1", ()
+        if self._fts and len(q) >= _TRIGRAM:
+            with self._lock:
+                dense = self._db.execute(
+                    "SELECT count(*) FROM (SELECT 1 FROM history_fts WHERE history_fts MATCH ? "
+                    "LIMIT ?)", (_phrase(q), _DENSE_MATCHES)).fetchone()[0] >= _DENSE_MATCHES
+            if not dense:
+                return ("id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)",
+                        (_phrase(q),))
+        # Too short for the trigram index, or matching so many rows that scanning in
+        # sort order finds a page of them almost at once.
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = " OR ".join(f"{f} LIKE ? ESCAPE '\\'" for f in _SEARCH_FIELDS)
+        return f"({where})", (pattern,) * len(_SEARCH_FIELDS)
 
-    def all(self) -> list[dict]:
-        return list(self._entries)
+    def all(self, limit: Optional[int] = None, offset: int = 0,
+            sort: str = "date", descending: bool = True) -> list[dict]:
+        return self.search("", limit, offset, sort, descending)
 
     def clear(self):
-        self._entries = []
-        self._save()
+        self._ready.wait()
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM history")
+            self.generation += 1
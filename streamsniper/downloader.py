@@ -1,12 +1,21 @@
+import collections
+import itertools
 import os
-import queue
 import threading
+import time
 import uuid
-from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from enum import Enum, auto
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional
+from urllib.parse import urlparse
 
-import yt_dlp
+from .archive import DownloadArchive, archive_keys, url_video_key
+from .cache import ExtractionCache, is_expired, normalize_url, video_key
+from .journal import QueueJournal
+from .pool import YoutubeDLPool
+from .postprocess import PostProcessPool, run_postprocessors, split_postprocessors
+from .throttle import RETRYABLE, ErrorKind, HostThrottle, backoff_delay, classify_error
 
 
 class DownloadState(Enum):
@@ -19,7 +28,7 @@ class DownloadState(Enum):
     CANCELLED = auto()
 
 
-@dataclass
+@dataclass(frozen=True)
 class DownloadProgress:
     state: DownloadState = DownloadState.QUEUED
     percent: float = 0.0
@@ -30,6 +39,7 @@ class DownloadProgress:
     filename: str = ""
     title: str = ""
     error: str = ""
+    stage: str = ""
 
 
 @dataclass
@@ -44,7 +54,14 @@ class VideoInfo:
     is_playlist: bool = False
     playlist_count: int = 0
     playlist_title: str = ""
-    entries: list = field(default_factory=list)
+    raw: dict = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class RawDownload:
+    filepath: str
+    info: dict = field(repr=False)
+    postprocessors: list[dict] = field(default_factory=list)
 
 
 @dataclass
@@ -53,6 +70,8 @@ class PlaylistEntry:
     title: str
     duration: str = ""
     index: int = 0
+    thumbnail_url: str = ""
+    video_key: Optional[str] = None
 
 
 def _format_duration(seconds: Optional[int]) -> str:
@@ -75,6 +94,19 @@ def _format_bytes(b: Optional[float]) -> str:
     return f"{b:.1f} TB"
 
 
+_HOST_PREFIXES = ("www.", "m.", "music.")
+_HOST_ALIASES = {"youtu.be": "youtube.com"}
+
+
+def host_key(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return _HOST_ALIASES.get(host, host)
+
+
 def build_format_spec(fmt: str, quality: str) -> dict:
     opts = {}
     if fmt == "audio":
@@ -95,35 +127,84 @@ def build_format_spec(fmt: str, quality: str) -> dict:
     return opts
 
 
+_FLAT_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+    "extract_flat": "in_playlist",
+    "skip_download": True,
+}
+_PLAYLIST_TYPES = ("playlist", "multi_video")
+_PLAYLIST_PAGE_SIZE = 50
+_PLAYLIST_CACHE_LIMIT = 5000
+_ENTRY_FIELDS = ("url", "webpage_url", "title", "duration", "id", "ie_key")
+
+
+def _cacheable(info: dict) -> dict:
+    import yt_dlp
+
+    if info.get("_type") in _PLAYLIST_TYPES:
+        info = dict(info, entries=list(info.get("entries") or []))
+        return yt_dlp.YoutubeDL.sanitize_info(info)
+    return yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True)
+
+
+def _iter_entries(entries) -> Iterator[dict]:
+    import yt_dlp
+
+    if isinstance(entries, yt_dlp.utils.PagedList):
+        start = 0
+        while True:
+            page = entries.getslice(start, start + _PLAYLIST_PAGE_SIZE)
+            if not page:
+                return
+            yield from page
+            start += len(page)
+    else:
+        yield from entries or []
+
+
+def _thumbnail_url(info: dict) -> str:
+    if info.get("thumbnail"):
+        return info["thumbnail"]
+    thumbnails = info.get("thumbnails") or []
+    return thumbnails[-1].get("url", "") if thumbnails else ""
+
+
 class Downloader:
-    def extract_info(self, url: str) -> VideoInfo:
-        opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "extract_flat": "in_playlist",
-            "skip_download": True,
-        }
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+    def __init__(self, cache: Optional[ExtractionCache] = None,
+                 pool: Optional[YoutubeDLPool] = None):
+        self.cache = cache
+        self.pool = pool or YoutubeDLPool()
 
+    @staticmethod
+    def _extract_unprocessed(ydl, url: str) -> Optional[dict]:
+        info = ydl.extract_info(url, download=False, process=False)
+        while info and info.get("_type") == "url":
+            info = ydl.extract_info(info["url"], download=False, process=False,
+                                    ie_key=info.get("ie_key"))
+        return info
+
+    def extract_info(self, url: str) -> VideoInfo:
+        info = self.cache.get(url, url_video_key(url)) if self.cache else None
         if info is None:
-            raise ValueError("Could not extract video info")
+            with self.pool.session(_FLAT_OPTS) as ydl:
+                info = self._extract_unprocessed(ydl, url)
+                if info is not None and info.get("_type") not in _PLAYLIST_TYPES:
+                    info = ydl.process_ie_result(info, download=False)
 
-        is_playlist = info.get("_type") == "playlist"
-        raw_entries = list(info.get("entries", []))
+            if info is None:
+                raise ValueError("Could not extract video info")
+            if info.get("_type") not in _PLAYLIST_TYPES:
+                info = _cacheable(info)
+                if self.cache:
+                    self.cache.put(url, info)
 
-        entries = []
+        is_playlist = info.get("_type") in _PLAYLIST_TYPES
+        playlist_count = 0
         if is_playlist:
-            for i, e in enumerate(raw_entries):
-                if e is None:
-                    continue
-                entry_url = e.get("url") or e.get("webpage_url", "")
-                entries.append(PlaylistEntry(
-                    url=entry_url,
-                    title=e.get("title", f"Video {i + 1}"),
-                    duration=_format_duration(e.get("duration")),
-                    index=i + 1,
-                ))
+            entries = info.get("entries")
+            playlist_count = info.get("playlist_count") or (
+                len(entries) if isinstance(entries, list) else 0)
 
         formats = []
         for f in info.get("formats", []):
@@ -138,20 +219,83 @@ class Downloader:
             title=info.get("title", "Unknown"),
             duration=_format_duration(info.get("duration")),
             duration_seconds=info.get("duration", 0) or 0,
-            thumbnail_url=info.get("thumbnail", ""),
+            thumbnail_url=_thumbnail_url(info),
             uploader=info.get("uploader", info.get("channel", "Unknown")),
             formats=formats,
             is_playlist=is_playlist,
-            playlist_count=len(entries),
+            playlist_count=playlist_count,
             playlist_title=info.get("title", "") if is_playlist else "",
-            entries=entries,
+            raw={} if is_playlist else info,
         )
 
-    def download(self, url: str, output_dir: str, fmt: str = "video",
-                 quality: str = "best", audio_format: str = "mp3",
-                 embed_thumbnail: bool = True, sponsorblock: bool = False,
-                 progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
-                 cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+    def iter_playlist(self, url: str) -> Iterator[PlaylistEntry]:
+        cached = self.cache.get(url, url_video_key(url)) if self.cache else None
+        if cached and isinstance(cached.get("entries"), list):
+            for i, e in enumerate(cached["entries"]):
+                if e:
+                    yield self._playlist_entry(e, i + 1)
+            return
+
+        with self.pool.session(_FLAT_OPTS) as ydl:
+            info = self._extract_unprocessed(ydl, url)
+            if info is None:
+                raise ValueError("Could not extract playlist info")
+            if info.get("_type") not in _PLAYLIST_TYPES:
+                yield PlaylistEntry(url=url, title=info.get("title") or url,
+                                    duration=_format_duration(info.get("duration")), index=1,
+                                    video_key=video_key(info))
+                return
+
+            kept: Optional[list[dict]] = []
+            for i, e in enumerate(_iter_entries(info.get("entries"))):
+                if e is None:
+                    continue
+                if kept is not None:
+                    kept.append(dict({k: e.get(k) for k in _ENTRY_FIELDS},
+                                     thumbnail=_thumbnail_url(e)))
+                    if len(kept) > _PLAYLIST_CACHE_LIMIT:
+                        kept = None
+                yield self._playlist_entry(e, i + 1)
+
+        if self.cache and kept is not None:
+            header = {k: v for k, v in info.items() if k != "entries"}
+            self.cache.put(url, _cacheable(dict(header, entries=kept)))
+
+    @staticmethod
+    def _playlist_entry(e: dict, index: int) -> PlaylistEntry:
+        return PlaylistEntry(
+            url=e.get("url") or e.get("webpage_url", ""),
+            title=e.get("title") or f"Video {index}",
+            duration=_format_duration(e.get("duration")),
+            index=index,
+            thumbnail_url=_thumbnail_url(e),
+            video_key=video_key(e),
+        )
+
+    def resolve(self, url: str, fmt: str = "video", quality: str = "best") -> dict:
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "skip_download": True,
+            "format": build_format_spec(fmt, quality)["format"],
+        }
+        with self.pool.session(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        if info is None:
+            raise ValueError("Could not extract video info")
+        info = _cacheable(info)
+        if self.cache:
+            self.cache.put(url, info)
+        return info
+
+    def fetch(self, url: str, output_dir: str, fmt: str = "video",
+              quality: str = "best", audio_format: str = "mp3",
+              embed_thumbnail: bool = True, sponsorblock: bool = False,
+              progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
+              cancel_event: Optional[threading.Event] = None,
+              info: Optional[dict] = None) -> Optional[RawDownload]:
+        import yt_dlp
+
         progress = DownloadProgress(state=DownloadState.EXTRACTING)
         if progress_callback:
             progress_callback(progress)
@@ -162,6 +306,12 @@ class Downloader:
 
         final_filepath = None
 
+        def report(**changes):
+            nonlocal progress
+            progress = replace(progress, **changes)
+            if progress_callback:
+                progress_callback(progress)
+
         def hook(d):
             nonlocal final_filepath
             if cancel_event and cancel_event.is_set():
@@ -169,33 +319,33 @@ class Downloader:
 
             status = d.get("status", "")
             if status == "downloading":
-                progress.state = DownloadState.DOWNLOADING
                 total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
                 downloaded = d.get("downloaded_bytes", 0)
-                progress.percent = (downloaded / total * 100) if total else 0
                 speed = d.get("speed")
-                progress.speed = f"{_format_bytes(speed)}/s" if speed else ""
                 eta = d.get("eta")
-                progress.eta = f"{eta}s" if eta else ""
-                progress.downloaded = _format_bytes(downloaded)
-                progress.total = _format_bytes(total)
-                progress.filename = d.get("filename", "")
-                if progress_callback:
-                    progress_callback(progress)
+                report(
+                    state=DownloadState.DOWNLOADING,
+                    percent=(downloaded / total * 100) if total else 0,
+                    speed=f"{_format_bytes(speed)}/s" if speed else "",
+                    eta=f"{eta}s" if eta else "",
+                    downloaded=_format_bytes(downloaded),
+                    total=_format_bytes(total),
+                    filename=d.get("filename", ""),
+                )
             elif status == "finished":
-                progress.state = DownloadState.PROCESSING
-                progress.percent = 100
                 final_filepath = d.get("filename", "")
-                if progress_callback:
-                    progress_callback(progress)
+                report(state=DownloadState.PROCESSING, percent=100)
+
+        def pp_hook(d):
+            if d.get("status") == "started":
+                report(state=DownloadState.PROCESSING, stage=d.get("postprocessor", ""))
 
         opts = {
             "outtmpl": f"{output_dir}/%(title)s.%(ext)s",
-            "progress_hooks": [hook],
             "quiet": True,
             "no_warnings": True,
             "merge_output_format": "mp4" if fmt == "video" else None,
-            "overwrites": True,
+            "continuedl": True,
             **format_opts,
         }
 
@@ -214,25 +364,94 @@ class Downloader:
             })
             opts["writethumbnail"] = True
 
+        inline, deferred = split_postprocessors(opts.pop("postprocessors", []))
+        opts["postprocessors"] = inline or None
         opts = {k: v for k, v in opts.items() if v is not None}
 
         try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                progress.title = info.get("title", "") if info else ""
-                if info and not final_filepath:
+            with self.pool.session(opts, progress_hook=hook, postprocessor_hook=pp_hook) as ydl:
+                info = self._process(ydl, url, info)
+                downloaded = (info or {}).get("requested_downloads") or []
+                if downloaded and downloaded[-1].get("filepath"):
+                    info = {k: v for k, v in info.items() if k != "requested_downloads"}
+                    info.update(downloaded[-1])
+                    final_filepath = info["filepath"]
+                elif info and not final_filepath:
                     final_filepath = ydl.prepare_filename(info)
         except yt_dlp.utils.DownloadCancelled:
-            progress.state = DownloadState.CANCELLED
-            if progress_callback:
-                progress_callback(progress)
+            report(state=DownloadState.CANCELLED)
             return None
 
-        progress.state = DownloadState.COMPLETE
-        progress.percent = 100
+        if not final_filepath:
+            return None
+        info = dict(info or {}, filepath=final_filepath)
+        info.pop("__postprocessors", None)
+        return RawDownload(final_filepath, yt_dlp.YoutubeDL.sanitize_info(info), deferred)
+
+    def download(self, url: str, output_dir: str, fmt: str = "video",
+                 quality: str = "best", audio_format: str = "mp3",
+                 embed_thumbnail: bool = True, sponsorblock: bool = False,
+                 progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 info: Optional[dict] = None) -> Optional[str]:
+        raw = self.fetch(url, output_dir, fmt, quality, audio_format, embed_thumbnail,
+                         sponsorblock, progress_callback, cancel_event, info)
+        if raw is None:
+            return None
+
+        def on_stage(key: str):
+            if progress_callback:
+                progress_callback(DownloadProgress(state=DownloadState.PROCESSING, percent=100,
+                                                   title=raw.info.get("title", ""), stage=key))
+
+        info = run_postprocessors(raw.postprocessors, raw.info, on_stage)
         if progress_callback:
-            progress_callback(progress)
-        return final_filepath
+            progress_callback(DownloadProgress(state=DownloadState.COMPLETE, percent=100,
+                                               title=info.get("title", "")))
+        return info.get("filepath") or raw.filepath
+
+    def _process(self, ydl, url: str, info: Optional[dict]) -> Optional[dict]:
+        import yt_dlp
+
+        if info:
+            try:
+                return ydl.process_ie_result(ydl.sanitize_info(dict(info)), download=True)
+            except yt_dlp.utils.DownloadError:
+                # Stream URLs in a reused info dict expire; fall back to a fresh extraction.
+                if self.cache:
+                    self.cache.invalidate(url)
+        info = ydl.extract_info(url, download=False)
+        if info and self.cache:
+            self.cache.put(url, _cacheable(info))
+        return ydl.process_ie_result(info, download=True) if info else None
+
+
+class PlaylistPager:
+    def __init__(self, downloader: Downloader, url: str):
+        self.url = url
+        self.entries: list[PlaylistEntry] = []
+        self.exhausted = False
+        self._iter = downloader.iter_playlist(url)
+        self._lock = threading.Lock()
+
+    def fetch(self, stop: int) -> list[PlaylistEntry]:
+        # Pulls the playlist forward until `stop` entries are loaded and returns
+        # only the newly loaded ones; nothing past `stop` is requested.
+        with self._lock:
+            start = len(self.entries)
+            while len(self.entries) < stop and not self.exhausted:
+                entry = next(self._iter, None)
+                if entry is None:
+                    self.exhausted = True
+                    break
+                self.entries.append(entry)
+            return self.entries[start:]
+
+    def close(self):
+        # Releases the extraction session held by a partially read playlist.
+        with self._lock:
+            self._iter.close()
+            self.exhausted = True
 
 
 @dataclass
@@ -243,6 +462,74 @@ class QueueItem:
     state: DownloadState = DownloadState.QUEUED
 
 
+class QueueChange(Enum):
+    ADDED = auto()
+    STATE = auto()
+    REMOVED = auto()
+
+
+@dataclass(frozen=True)
+class QueueEvent:
+    change: QueueChange
+    item: QueueItem
+
+
+_FINISHED_STATES = (DownloadState.COMPLETE, DownloadState.ERROR, DownloadState.CANCELLED)
+
+
+class QueueModel:
+    def __init__(self, retention: int = 200):
+        self.retention = max(0, retention)
+        self.evicted: collections.Counter[DownloadState] = collections.Counter()
+        self._items: dict[str, QueueItem] = {}
+        self._finished: collections.OrderedDict[str, None] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: QueueItem):
+        self._items[item.task_id] = item
+        if item.state in _FINISHED_STATES:
+            self._finished[item.task_id] = None
+
+    def get(self, task_id: str) -> Optional[QueueItem]:
+        return self._items.get(task_id)
+
+    def set_state(self, task_id: str, state: DownloadState) -> tuple[Optional[QueueItem], list[QueueItem]]:
+        item = self._items.get(task_id)
+        if item is None:
+            return None, []
+        item.state = state
+        if state in _FINISHED_STATES:
+            self._finished[task_id] = None
+            self._finished.move_to_end(task_id)
+        else:
+            self._finished.pop(task_id, None)
+        return replace(item), self._evict()
+
+    def _evict(self) -> list[QueueItem]:
+        evicted = []
+        while len(self._finished) > self.retention:
+            task_id, _ = self._finished.popitem(last=False)
+            item = self._items.pop(task_id)
+            self.evicted[item.state] += 1
+            evicted.append(item)
+        return evicted
+
+    def remove(self, task_id: str) -> Optional[QueueItem]:
+        self._finished.pop(task_id, None)
+        return self._items.pop(task_id, None)
+
+    def clear_finished(self) -> list[QueueItem]:
+        removed = [self._items.pop(task_id) for task_id in self._finished]
+        self._finished.clear()
+        self.evicted.clear()
+        return removed
+
+    def snapshot(self) -> list[QueueItem]:
+        return [replace(item) for item in self._items.values()]
+
+
 @dataclass
 class _Task:
     task_id: str
@@ -254,104 +541,564 @@ class _Task:
     audio_format: str
     embed_thumbnail: bool
     sponsorblock: bool
+    host: str = ""
+    info: Optional[dict] = field(default=None, repr=False)
+    resolving: Optional[threading.Event] = field(default=None, repr=False)
+    video_key: Optional[str] = None
+    flight_key: str = ""
+    state: DownloadState = DownloadState.QUEUED
+    attempts: int = 0
+    not_before: float = 0.0
+    retrying: bool = False
+    # Tasks whose queue items follow this task's transfer; starts as just the task itself.
+    subscribers: list["_Task"] = field(default_factory=list, repr=False)
+
+
+_TASK_SPEC_FIELDS = ("url", "title", "output_dir", "fmt", "quality", "audio_format",
+                     "embed_thumbnail", "sponsorblock")
+
+
+def _task_spec(task: _Task) -> dict:
+    return {k: getattr(task, k) for k in _TASK_SPEC_FIELDS}
+
+
+def _flight_key(task: _Task, key: Optional[str]) -> str:
+    # Tasks with the same key would write the same bytes to the same file.
+    return "\0".join(str(v) for v in (
+        key or normalize_url(task.url), task.output_dir, task.fmt, task.quality,
+        task.audio_format, task.embed_thumbnail, task.sponsorblock))
+
+
+_RESOLVE_WAIT = 30.0
+_SKIP_REPORT_EVERY = 100
 
 
 class DownloadManager:
-    def __init__(self):
-        self._queue: queue.Queue[_Task] = queue.Queue()
-        self._downloader = Downloader()
-        self._cancel_event = threading.Event()
-        self._current_task: Optional[_Task] = None
-        self._pending: list[QueueItem] = []
+    def __init__(self, max_workers: int = 3, max_per_host: int = 2,
+                 cache: Optional[ExtractionCache] = None,
+                 downloader: Optional[Downloader] = None,
+                 max_backlog: int = 200, lookahead: int = 3,
+                 postprocess_workers: int = 0, retention: int = 200,
+                 journal: Optional[QueueJournal] = None,
+                 archive: Optional[DownloadArchive] = None, max_retries: int = 5):
+        self._tasks: collections.deque[_Task] = collections.deque()
+        self.downloader = downloader or Downloader(cache, YoutubeDLPool(max_idle=max_workers + 2))
+        self.cache = cache or self.downloader.cache
+        self._active: dict[str, _Task] = {}
+        self._cancel_events: dict[str, threading.Event] = {}
+        self._host_counts: collections.Counter[str] = collections.Counter()
+        self._queue = QueueModel(retention)
         self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._max_workers = max(1, max_workers)
+        self._max_per_host = max(1, max_per_host)
+        self._max_backlog = max(1, max_backlog)
+        self._max_retries = max(0, max_retries)
+        self._throttle = HostThrottle(self._max_per_host)
+        self._ingestions: dict[str, threading.Event] = {}
+        self._flights: dict[str, _Task] = {}
+        self._lookahead = max(0, lookahead)
+        self._resolver = ThreadPoolExecutor(max_workers=max(1, min(self._lookahead, 4)),
+                                            thread_name_prefix="lookahead")
+        self._postprocessor = PostProcessPool(postprocess_workers)
+        self._postprocessing: dict[str, threading.Event] = {}
+        self._workers: list[threading.Thread] = []
+        self._journal = journal
+        self.archive = archive
+        self._closing = False
         self.on_progress: Optional[Callable[[str, DownloadProgress], None]] = None
         self.on_complete: Optional[Callable[[str, str, dict], None]] = None
         self.on_error: Optional[Callable[[str, str], None]] = None
-        self.on_queue_update: Optional[Callable[[list[QueueItem]], None]] = None
-        self._worker = threading.Thread(target=self._run, daemon=True)
-        self._worker.start()
+        self.on_queue_change: Optional[Callable[[QueueEvent], None]] = None
+        self.on_playlist_progress: Optional[Callable[[str, int, int, bool], None]] = None
+        with self._lock:
+            self._spawn_workers()
+
+    def _spawn_workers(self):
+        while len(self._workers) < self._max_workers:
+            worker = threading.Thread(target=self._run, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def set_concurrency(self, max_workers: int, max_per_host: int):
+        with self._wakeup:
+            self._max_workers = max(1, max_workers)
+            self._max_per_host = max(1, max_per_host)
+            self._throttle.set_max_per_host(self._max_per_host)
+            self.downloader.pool.max_idle = max(self.downloader.pool.max_idle, self._max_workers + 2)
+            self._spawn_workers()
+            self._wakeup.notify_all()
 
     def enqueue(self, url: str, output_dir: str, title: str = "",
                 fmt: str = "video", quality: str = "best",
                 audio_format: str = "mp3", embed_thumbnail: bool = True,
-                sponsorblock: bool = False) -> str:
-        task_id = str(uuid.uuid4())[:8]
-        task = _Task(task_id, url, title or url, output_dir, fmt, quality,
-                     audio_format, embed_thumbnail, sponsorblock)
-        item = QueueItem(task_id, url, title or url, DownloadState.QUEUED)
+                sponsorblock: bool = False, info: Optional[dict] = None,
+                key: Optional[str] = None) -> Optional[str]:
+        # Returns None, without queueing, when the video is already in the archive.
+        # key is the "extractor id" if the caller knows it, e.g. from a playlist entry.
+        key = key or (video_key(info) if info else url_video_key(url))
+        if self.archive is not None and self.archive.known(archive_keys(url, key)):
+            return None
+        return self._enqueue(url, output_dir, title, fmt, quality, audio_format,
+                             embed_thumbnail, sponsorblock, info, key=key)
+
+    def _enqueue(self, url: str, output_dir: str, title: str = "",
+                 fmt: str = "video", quality: str = "best",
+                 audio_format: str = "mp3", embed_thumbnail: bool = True,
+                 sponsorblock: bool = False, info: Optional[dict] = None,
+                 playlist_id: str = "", key: Optional[str] = None) -> str:
+        task = _Task(str(uuid.uuid4())[:8], url, title or url, output_dir, fmt, quality,
+                     audio_format, embed_thumbnail, sponsorblock, host_key(url), info)
+        if self._journal:
+            self._journal.enqueue(task.task_id, _task_spec(task), playlist_id)
+        self._add_task(task, key)
+        return task.task_id
+
+    def _add_task(self, task: _Task, key: Optional[str] = None):
+        # A task for a video that is already queued or in flight with the same options
+        # rides along on that transfer instead of starting its own (single flight).
+        task.video_key = key
+        task.flight_key = _flight_key(task, key)
+        item = QueueItem(task.task_id, task.url, task.title, DownloadState.QUEUED)
+        with self._wakeup:
+            self._queue.add(item)
+            leader = self._flights.get(task.flight_key)
+            if leader is not None:
+                leader.subscribers.append(task)
+                state = leader.state
+            else:
+                task.subscribers.append(task)
+                self._flights[task.flight_key] = task
+                self._tasks.append(task)
+                self._wakeup.notify()
+                self._schedule_lookahead()
+        self._fire_queue_change(QueueChange.ADDED, item)
+        if leader is not None and state is not DownloadState.QUEUED:
+            self._set_item_state(task.task_id, state)
+
+    def restore(self) -> int:
+        # Requeues whatever the journal says was unfinished when the last run ended;
+        # partially downloaded files continue from their .part offset.
+        if not self._journal:
+            return 0
+        tasks, playlists = self._journal.replay()
+        keys = {t["task_id"]: url_video_key(t["url"]) for t in tasks}
+        if self.archive is not None:
+            # Finished while shutting down, after the journal was closed.
+            tasks = [t for t in tasks
+                     if not self.archive.known(archive_keys(t["url"], keys[t["task_id"]]))]
+        self._journal.compact(tasks, playlists)
+        for record in tasks:
+            spec = {k: record[k] for k in _TASK_SPEC_FIELDS}
+            self._add_task(_Task(record["task_id"], host=host_key(record["url"]), **spec),
+                           keys[record["task_id"]])
+        for record in playlists:
+            options = {k: record[k] for k in _TASK_SPEC_FIELDS if k not in ("url", "title")}
+            self._start_ingestion(record["playlist_id"], record["url"], options,
+                                  skip=record["ingested"])
+        return len(tasks)
+
+    def enqueue_playlist(self, url: str, output_dir: str, fmt: str = "video",
+                         quality: str = "best", audio_format: str = "mp3",
+                         embed_thumbnail: bool = True, sponsorblock: bool = False) -> str:
+        playlist_id = str(uuid.uuid4())[:8]
+        options = dict(output_dir=output_dir, fmt=fmt, quality=quality,
+                       audio_format=audio_format, embed_thumbnail=embed_thumbnail,
+                       sponsorblock=sponsorblock)
+        if self._journal:
+            self._journal.playlist(playlist_id, url, options)
+        self._start_ingestion(playlist_id, url, options)
+        return playlist_id
+
+    def _start_ingestion(self, playlist_id: str, url: str, options: dict, skip: int = 0):
+        stop = threading.Event()
         with self._lock:
-            self._pending.append(item)
-        self._queue.put(task)
-        self._fire_queue_update()
-        return task_id
+            self._ingestions[playlist_id] = stop
+        threading.Thread(target=self._ingest, args=(playlist_id, url, options, stop, skip),
+                         daemon=True).start()
 
-    def cancel_current(self):
-        self._cancel_event.set()
+    def _ingest(self, playlist_id: str, url: str, options: dict, stop: threading.Event,
+                skip: int = 0):
+        queued = skip
+        # Archived entries are skipped without a journal record of their own; the
+        # pending count is journaled ahead of the next enqueue so resuming still
+        # lands on the right entry.
+        skipped = pending = 0
+        try:
+            for i, entry in enumerate(self.downloader.iter_playlist(url)):
+                if i < skip:
+                    continue
+                if stop.is_set():
+                    break
+                if self.archive is not None and self.archive.known(
+                        archive_keys(entry.url, entry.video_key)):
+                    skipped += 1
+                    pending += 1
+                    if self.on_playlist_progress and skipped % _SKIP_REPORT_EVERY == 0:
+                        self.on_playlist_progress(playlist_id, queued, skipped, False)
+                    continue
+                if not self._wait_for_backlog(stop):
+                    break
+                if self._journal and pending:
+                    self._journal.playlist_skipped(playlist_id, pending)
+                pending = 0
+                self._enqueue(entry.url, title=entry.title, playlist_id=playlist_id,
+                              key=entry.video_key, **options)
+                queued += 1
+                if self.on_playlist_progress:
+                    self.on_playlist_progress(playlist_id, queued, skipped, False)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(playlist_id, str(e))
+        finally:
+            with self._wakeup:
+                self._ingestions.pop(playlist_id, None)
+                self._wakeup.notify_all()
+            if self._journal and not self._closing:
+                self._journal.playlist_done(playlist_id)
+            if self.on_playlist_progress:
+                self.on_playlist_progress(playlist_id, queued, skipped, True)
+
+    def _wait_for_backlog(self, stop: threading.Event) -> bool:
+        with self._wakeup:
+            while len(self._tasks) >= self._max_backlog and not stop.is_set():
+                self._wakeup.wait()
+        return not stop.is_set()
+
+    def cancel_playlist(self, playlist_id: str):
+        with self._wakeup:
+            stop = self._ingestions.get(playlist_id)
+            if stop:
+                stop.set()
+                self._wakeup.notify_all()
+
+    def cancel(self, task_id: str):
+        # Cancelling one of several tasks sharing a transfer only detaches it;
+        # the transfer stops once nobody is left waiting for it.
+        event = queued = None
+        with self._lock:
+            leader = next((t for t in self._flights.values()
+                           if any(s.task_id == task_id for s in t.subscribers)), None)
+            if leader is None:
+                return
+            if len(leader.subscribers) > 1:
+                leader.subscribers[:] = [s for s in leader.subscribers if s.task_id != task_id]
+            else:
+                event = (self._cancel_events.get(leader.task_id)
+                         or self._postprocessing.get(leader.task_id))
+                queued = next((t for t in self._tasks if t.task_id == leader.task_id), None)
+                if queued:
+                    self._tasks.remove(queued)
+        if event:
+            event.set()
+        elif queued:
+            self._settle(queued, DownloadState.CANCELLED)
+        else:
+            self._set_item_state(task_id, DownloadState.CANCELLED)
+
+    def cancel_active(self):
+        with self._wakeup:
+            for event in (list(self._cancel_events.values()) + list(self._postprocessing.values())
+                          + list(self._ingestions.values())):
+                event.set()
+            self._wakeup.notify_all()
+
+    def shutdown(self):
+        # Work interrupted by shutdown stays unfinished in the journal so the next run resumes it.
+        with self._lock:
+            self._closing = True
+        self.cancel_active()
+        self._resolver.shutdown(wait=False, cancel_futures=True)
+        self._postprocessor.shutdown()
+        if self._journal:
+            self._journal.close()
+
+    def active_tasks(self) -> list[str]:
+        with self._lock:
+            return list(self._active)
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            return (not self._tasks and not self._active and not self._postprocessing
+                    and not self._ingestions)
 
     def queue_snapshot(self) -> list[QueueItem]:
         with self._lock:
-            return list(self._pending)
+            return self._queue.snapshot()
 
-    def _fire_queue_update(self):
-        if self.on_queue_update:
-            self.on_queue_update(self.queue_snapshot())
+    def evicted_counts(self) -> dict[DownloadState, int]:
+        # Finished items dropped from the queue to stay within retention, by final state.
+        with self._lock:
+            return dict(self._queue.evicted)
 
-    def _set_item_state(self, task_id: str, state: DownloadState):
+    def queue_item(self, task_id: str) -> Optional[QueueItem]:
         with self._lock:
-            for item in self._pending:
-                if item.task_id == task_id:
-                    item.state = state
-                    break
-        self._fire_queue_update()
+            item = self._queue.get(task_id)
+            return replace(item) if item else None
+
+    def clear_finished(self):
+        with self._lock:
+            removed = self._queue.clear_finished()
+        for item in removed:
+            self._fire_queue_change(QueueChange.REMOVED, item)
+
+    def _fire_queue_change(self, change: QueueChange, item: QueueItem):
+        if self.on_queue_change:
+            self.on_queue_change(QueueEvent(change, replace(item)))
+
+    def _set_item_state(self, task_id: str, state: DownloadState, path: str = "",
+                        error: str = ""):
+        if self._journal and not self._closing:
+            self._journal.state(task_id, state.name, path)
+        with self._lock:
+            changed, evicted = self._queue.set_state(task_id, state)
+        if changed:
+            self._fire_queue_change(QueueChange.STATE, changed)
+            # Every way a task can end publishes exactly one final snapshot, so
+            # progress listeners can forget the task.
+            if state in _FINISHED_STATES and self.on_progress:
+                self.on_progress(task_id, DownloadProgress(
+                    state=state, percent=100 if state is DownloadState.COMPLETE else 0,
+                    title=changed.title, error=error))
+        for item in evicted:
+            self._fire_queue_change(QueueChange.REMOVED, item)
+
+    def _set_state(self, task: _Task, state: DownloadState):
+        with self._lock:
+            task.state = state
+            subscribers = list(task.subscribers)
+        for t in subscribers:
+            self._set_item_state(t.task_id, state)
+
+    def _settle(self, task: _Task, state: DownloadState, path: str = "",
+                error: str = "") -> list[_Task]:
+        # Final state for a transfer: it stops taking subscribers, and every task
+        # still subscribed ends in the same state.
+        with self._lock:
+            task.state = state
+            if self._flights.get(task.flight_key) is task:
+                del self._flights[task.flight_key]
+            subscribers = list(task.subscribers)
+        for t in subscribers:
+            self._set_item_state(t.task_id, state, path, error)
+        return subscribers
+
+    def _ready_at(self, task: _Task) -> float:
+        return max(task.not_before, self._throttle.ready_at(task.host))
+
+    def _next_task(self) -> _Task:
+        with self._wakeup:
+            while True:
+                # Tasks backing off, or on a host that is being throttled, are passed
+                # over; the wait ends when the first of them becomes ready.
+                timeout = None
+                if not self._closing and len(self._active) < self._max_workers:
+                    now = time.monotonic()
+                    for task in self._tasks:
+                        ready = self._ready_at(task)
+                        if ready > now:
+                            wait = ready - now
+                            timeout = wait if timeout is None else min(timeout, wait)
+                            continue
+                        if self._host_counts[task.host] < self._throttle.limit(task.host):
+                            self._tasks.remove(task)
+                            self._active[task.task_id] = task
+                            self._cancel_events[task.task_id] = threading.Event()
+                            self._host_counts[task.host] += 1
+                            self._throttle.started(task.host)
+                            self._wakeup.notify_all()
+                            self._schedule_lookahead()
+                            return task
+                self._wakeup.wait(timeout)
+
+    def _schedule_lookahead(self):
+        # Callers hold the lock, which shutdown() takes to set _closing, so the
+        # resolver is never used after it has been shut down.
+        if self._closing:
+            return
+        now = time.monotonic()
+        for task in itertools.islice(self._tasks, self._lookahead):
+            if task.resolving is not None or self._ready_at(task) > now:
+                continue
+            if task.info is not None and not is_expired(task.info):
+                continue
+            task.info = None
+            task.resolving = threading.Event()
+            try:
+                self._resolver.submit(self._resolve, task)
+            except RuntimeError:
+                task.resolving = None
+                return
+
+    def _resolve(self, task: _Task):
+        try:
+            info = self.cache.get(task.url, task.video_key) if self.cache else None
+            if info is None or is_expired(info):
+                info = self.downloader.resolve(task.url, task.fmt, task.quality)
+            task.info = info
+        except Exception as e:
+            # The transfer retries the extraction itself; only the throttling signal is kept.
+            with self._lock:
+                self._throttle.record(task.host, classify_error(e))
+        finally:
+            resolving, task.resolving = task.resolving, None
+            resolving.set()
+
+    def _release(self, task: _Task):
+        cancelled = False
+        with self._wakeup:
+            self._active.pop(task.task_id, None)
+            event = self._cancel_events.pop(task.task_id, None)
+            self._host_counts[task.host] -= 1
+            if self._host_counts[task.host] <= 0:
+                del self._host_counts[task.host]
+            if task.retrying:
+                # Requeued only now, so no other worker can pick it up while it is still active.
+                task.retrying = False
+                if event is not None and event.is_set():
+                    cancelled = True
+                else:
+                    self._tasks.appendleft(task)
+            self._wakeup.notify_all()
+        if cancelled:
+            self._settle(task, DownloadState.CANCELLED)
+
+    def _retry(self, task: _Task, error: Exception) -> bool:
+        kind = classify_error(error)
+        with self._lock:
+            self._throttle.record(task.host, kind)
+            if kind not in RETRYABLE or task.attempts >= self._max_retries or self._closing:
+                return False
+            task.attempts += 1
+            task.not_before = time.monotonic() + backoff_delay(task.attempts)
+            task.retrying = True
+            subscribers = list(task.subscribers)
+        # A 403 often means the extracted stream URLs went stale; extract again next time.
+        task.info = None
+        if kind is ErrorKind.THROTTLED and self.cache:
+            self.cache.invalidate(task.url)
+        self._set_state(task, DownloadState.QUEUED)
+        if self.on_progress:
+            for t in subscribers:
+                self.on_progress(t.task_id, DownloadProgress(
+                    state=DownloadState.QUEUED, title=t.title, error=str(error), stage="retry"))
+        return True
 
     def _run(self):
         while True:
-            task = self._queue.get()
-            self._current_task = task
-            self._cancel_event.clear()
-            self._set_item_state(task.task_id, DownloadState.DOWNLOADING)
+            task = self._next_task()
+            try:
+                self._process(task)
+            finally:
+                self._release(task)
 
-            def progress_cb(p: DownloadProgress):
-                if self.on_progress:
-                    self.on_progress(task.task_id, p)
+    def _process(self, task: _Task):
+        with self._lock:
+            cancel_event = self._cancel_events[task.task_id]
+        self._set_state(task, DownloadState.DOWNLOADING)
+        resolving = task.resolving
+        if resolving is not None:
+            # A look-ahead extraction is already in flight; waiting is cheaper than repeating it.
+            resolving.wait(_RESOLVE_WAIT)
+        info = task.info
+        if info is not None and is_expired(info):
+            info = None
+        if info is None and self.cache:
+            info = self.cache.get(task.url, task.video_key)
+
+        def progress_cb(p: DownloadProgress):
+            # The final snapshot comes from _set_item_state once the task has settled.
+            if self.on_progress and p.state not in _FINISHED_STATES:
+                with self._lock:
+                    subscribers = list(task.subscribers)
+                for t in subscribers:
+                    self.on_progress(t.task_id, p)
+
+        try:
+            raw = self.downloader.fetch(
+                url=task.url,
+                output_dir=task.output_dir,
+                fmt=task.fmt,
+                quality=task.quality,
+                audio_format=task.audio_format,
+                embed_thumbnail=task.embed_thumbnail,
+                sponsorblock=task.sponsorblock,
+                progress_callback=progress_cb,
+                cancel_event=cancel_event,
+                info=info,
+            )
+        except Exception as e:
+            if not self._retry(task, e):
+                self._fail(task, e)
+            return
+        if raw is None:
+            self._settle(task, DownloadState.CANCELLED)
+            return
+        with self._lock:
+            self._throttle.success(task.host)
+        if not raw.postprocessors:
+            self._finish(task, raw.filepath, raw.info)
+            return
 
+        # Transcoding runs on the process pool so this worker can start the next transfer.
+        self._set_state(task, DownloadState.PROCESSING)
+        with self._lock:
+            self._postprocessing[task.task_id] = cancel_event
+
+        def on_stage(key: str):
+            progress_cb(DownloadProgress(state=DownloadState.PROCESSING, percent=100,
+                                         title=raw.info.get("title", ""), stage=key))
+
+        future = self._postprocessor.submit(raw.postprocessors, raw.info, on_stage, cancel_event)
+        future.add_done_callback(lambda f: self._postprocess_done(task, raw, f))
+
+    def _postprocess_done(self, task: _Task, raw: RawDownload, future: Future):
+        # The task counts as busy until its callbacks have run, so is_idle() can't
+        # report an empty manager before on_complete / on_error has been called.
+        try:
             try:
-                filepath = self._downloader.download(
-                    url=task.url,
-                    output_dir=task.output_dir,
-                    fmt=task.fmt,
-                    quality=task.quality,
-                    audio_format=task.audio_format,
-                    embed_thumbnail=task.embed_thumbnail,
-                    sponsorblock=task.sponsorblock,
-                    progress_callback=progress_cb,
-                    cancel_event=self._cancel_event,
-                )
-                if filepath and self.on_complete:
-                    size_mb = 0.0
-                    actual_path = filepath
-                    if task.fmt == "audio":
-                        base = os.path.splitext(filepath)[0]
-                        for ext in (".mp3", ".m4a", ".opus", ".wav", ".flac"):
-                            if os.path.exists(base + ext):
-                                actual_path = base + ext
-                                break
-                    if os.path.exists(actual_path):
-                        size_mb = os.path.getsize(actual_path) / (1024 * 1024)
-                    self._set_item_state(task.task_id, DownloadState.COMPLETE)
-                    self.on_complete(task.task_id, actual_path, {
-                        "url": task.url,
-                        "title": task.title,
-                        "format": task.fmt,
-                        "quality": task.quality,
-                        "filesize_mb": size_mb,
-                    })
-                elif not filepath:
-                    self._set_item_state(task.task_id, DownloadState.CANCELLED)
+                info = future.result()
             except Exception as e:
-                self._set_item_state(task.task_id, DownloadState.ERROR)
-                if self.on_error:
-                    self.on_error(task.task_id, str(e))
-            finally:
-                self._current_task = None
-                self._queue.task_done()
+                self._fail(task, e)
+                return
+            if info is None:
+                self._settle(task, DownloadState.CANCELLED)
+                return
+            self._finish(task, info.get("filepath") or raw.filepath, info)
+        finally:
+            with self._wakeup:
+                self._postprocessing.pop(task.task_id, None)
+                self._wakeup.notify_all()
+
+    def _finish(self, task: _Task, filepath: str, info: dict):
+        size_mb = 0.0
+        actual_path = filepath
+        if task.fmt == "audio":
+            base = os.path.splitext(filepath)[0]
+            for ext in (".mp3", ".m4a", ".opus", ".wav", ".flac"):
+                if os.path.exists(base + ext):
+                    actual_path = base + ext
+                    break
+        if os.path.exists(actual_path):
+            size_mb = os.path.getsize(actual_path) / (1024 * 1024)
+        if self.archive is not None:
+            self.archive.add(archive_keys(task.url, video_key(info)))
+        for t in self._settle(task, DownloadState.COMPLETE, actual_path):
+            if self.on_complete:
+                title = t.title if t.title != t.url else info.get("title") or t.title
+                self.on_complete(t.task_id, actual_path, {
+                    "url": t.url,
+                    "title": title,
+                    "format": t.fmt,
+                    "quality": t.quality,
+                    "filesize_mb": size_mb,
+                    "duration": _format_duration(info.get("duration")) if info.get("duration") else "",
+                    "uploader": info.get("uploader") or info.get("channel") or "",
+                    "extractor": info.get("extractor_key") or "",
+                    "video_id": info.get("id") or "",
+                })
+
+    def _fail(self, task: _Task, error: Exception):
+        for t in self._settle(task, DownloadState.ERROR, error=str(error)):
+            if self.on_error:
+                self.on_error(t.task_id, str(error))
@@ -0,0 +1,57 @@
+import threading
+
+from .downloader import DownloadProgress, DownloadState, QueueEvent
+
+TERMINAL_STATES = (DownloadState.COMPLETE, DownloadState.ERROR, DownloadState.CANCELLED)
+
+
+def progress_fields(progress: DownloadProgress) -> dict:
+    return {
+        "state": progress.state.name.lower(),
+        "percent": round(progress.percent, 1),
+        "speed": progress.speed,
+        "eta": progress.eta,
+        "downloaded": progress.downloaded,
+        "total": progress.total,
+        "title": progress.title,
+        "stage": progress.stage,
+    }
+
+
+class ProgressChannel:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phase: dict[str, tuple[DownloadState, str]] = {}
+        self._transitions: list[tuple[str, DownloadProgress]] = []
+        self._latest: dict[str, DownloadProgress] = {}
+        self._queue_events: list[QueueEvent] = []
+
+    def publish(self, task_id: str, progress: DownloadProgress):
+        phase = (progress.state, progress.stage)
+        with self._lock:
+            if self._phase.get(task_id) == phase:
+                self._latest[task_id] = progress
+                return
+            # Phase changes are queued in order and never coalesced away.
+            self._transitions.append((task_id, progress))
+            self._latest.pop(task_id, None)
+            if progress.state in TERMINAL_STATES:
+                self._phase.pop(task_id, None)
+            else:
+                self._phase[task_id] = phase
+
+    def post(self, event: QueueEvent):
+        with self._lock:
+            self._queue_events.append(event)
+
+    def drain_queue_events(self) -> list[QueueEvent]:
+        with self._lock:
+            events, self._queue_events = self._queue_events, []
+        return events
+
+    def drain(self) -> list[tuple[str, DownloadProgress]]:
+        with self._lock:
+            events = self._transitions + list(self._latest.items())
+            self._transitions = []
+            self._latest = {}
+        return events
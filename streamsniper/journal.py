@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .config import _config_dir
+
+# Tasks in these states are finished for good and are not replayed.
+_FINAL_STATES = {"COMPLETE", "ERROR", "CANCELLED"}
+
+
+class QueueJournal:
+    def __init__(self, path: Optional[Path] = None):
+        self._path = path or _config_dir() / "queue.journal"
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _append(self, record: dict, sync: bool = False):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def enqueue(self, task_id: str, spec: dict, playlist_id: str = ""):
+        self._append({"op": "enqueue", "task_id": task_id, "playlist_id": playlist_id, **spec},
+                     sync=True)
+
+    def state(self, task_id: str, state: str, path: str = ""):
+        record = {"op": "state", "task_id": task_id, "state": state}
+        if path:
+            record["path"] = path
+        self._append(record, sync=state in _FINAL_STATES)
+
+    def playlist(self, playlist_id: str, url: str, options: dict):
+        self._append({"op": "playlist", "playlist_id": playlist_id, "url": url, **options},
+                     sync=True)
+
+    def playlist_skipped(self, playlist_id: str, count: int):
+        # Entries passed over without an enqueue record; synced by the enqueue that follows.
+        self._append({"op": "playlist_skip", "playlist_id": playlist_id, "count": count})
+
+    def playlist_done(self, playlist_id: str):
+        self._append({"op": "playlist_done", "playlist_id": playlist_id}, sync=True)
+
+    def replay(self) -> tuple[list[dict], list[dict]]:
+        # Returns (unfinished task records, unfinished playlist records). A playlist
+        # record gets "ingested": how many of its entries were already queued or skipped.
+        tasks: dict[str, dict] = {}
+        playlists: dict[str, dict] = {}
+        try:
+            f = open(self._path, encoding="utf-8")
+        except FileNotFoundError:
+            return [], []
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                op = record.pop("op", None)
+                if op == "enqueue":
+                    tasks[record["task_id"]] = record
+                    if record.get("playlist_id") in playlists:
+                        playlists[record["playlist_id"]]["ingested"] += 1
+                elif op == "state" and record["state"] in _FINAL_STATES:
+                    tasks.pop(record["task_id"], None)
+                elif op == "playlist":
+                    playlists[record["playlist_id"]] = dict(record, ingested=record.pop("skip", 0))
+                elif op == "playlist_skip" and record["playlist_id"] in playlists:
+                    playlists[record["playlist_id"]]["ingested"] += record["count"]
+                elif op == "playlist_done":
+                    playlists.pop(record["playlist_id"], None)
+        return list(tasks.values()), list(playlists.values())
+
+    def compact(self, tasks: list[dict], playlists: list[dict]):
+        # Rewrites the journal to just the still-pending records, atomically.
+        tmp = self._path.with_suffix(".tmp")
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(tmp, "w", encoding="utf-8") as f:
+                for p in playlists:
+                    # Entries already queued from a playlist are counted in "skip", since
+                    # the enqueue records that counted them may be compacted away.
+                    record = {k: v for k, v in p.items() if k != "ingested"}
+                    record = {"op": "playlist", **record, "skip": p.get("ingested", 0)}
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                for t in tasks:
+                    # Already counted in their playlist's "skip".
+                    record = {"op": "enqueue", **t, "playlist_id": ""}
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
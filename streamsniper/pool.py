@@ -0,0 +1,105 @@
+import collections
+import json
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+
+def _options_key(opts: dict) -> str:
+    return json.dumps(opts, sort_keys=True, default=repr)
+
+
+class _Session:
+    def __init__(self, opts: dict):
+        import yt_dlp
+
+        self.progress_hook: Optional[Callable[[dict], None]] = None
+        self.postprocessor_hook: Optional[Callable[[dict], None]] = None
+        self.ydl = yt_dlp.YoutubeDL({
+            **opts,
+            "progress_hooks": [self._on_progress],
+            "postprocessor_hooks": [self._on_postprocess],
+        })
+
+    def _on_progress(self, d: dict):
+        if self.progress_hook:
+            self.progress_hook(d)
+
+    def _on_postprocess(self, d: dict):
+        if self.postprocessor_hook:
+            self.postprocessor_hook(d)
+
+    def close(self):
+        self.ydl.close()
+
+
+class YoutubeDLPool:
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._idle: collections.OrderedDict[str, list[_Session]] = collections.OrderedDict()
+        self._idle_count = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, opts: dict,
+                progress_hook: Optional[Callable[[dict], None]] = None,
+                postprocessor_hook: Optional[Callable[[dict], None]] = None,
+                ) -> Iterator["yt_dlp.YoutubeDL"]:
+        key = _options_key(opts)
+        session = self._acquire(key, opts)
+        session.progress_hook = progress_hook
+        session.postprocessor_hook = postprocessor_hook
+        try:
+            yield session.ydl
+        except BaseException:
+            # A session that raised mid-download may hold half-finished state; don't reuse it.
+            session.close()
+            raise
+        else:
+            session.progress_hook = None
+            session.postprocessor_hook = None
+            self._release(key, session)
+
+    def _acquire(self, key: str, opts: dict) -> _Session:
+        with self._lock:
+            sessions = self._idle.get(key)
+            if sessions:
+                session = sessions.pop()
+                if not sessions:
+                    del self._idle[key]
+                self._idle_count -= 1
+                self.reused += 1
+                return session
+            self.created += 1
+        return _Session(opts)
+
+    def _release(self, key: str, session: _Session):
+        evicted = []
+        with self._lock:
+            if self.max_idle <= 0:
+                evicted.append(session)
+            else:
+                self._idle.setdefault(key, []).append(session)
+                self._idle.move_to_end(key)
+                self._idle_count += 1
+                while self._idle_count > self.max_idle:
+                    oldest_key, sessions = next(iter(self._idle.items()))
+                    evicted.append(sessions.pop(0))
+                    if not sessions:
+                        del self._idle[oldest_key]
+                    self._idle_count -= 1
+        for s in evicted:
+            s.close()
+
+    def close(self):
+        with self._lock:
+            sessions = [s for group in self._idle.values() for s in group]
+            self._idle.clear()
+            self._idle_count = 0
+        for s in sessions:
+            s.close()
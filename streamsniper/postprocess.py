@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+DEFERRED_POSTPROCESSORS = {"FFmpegExtractAudio", "EmbedThumbnail", "SponsorBlock", "ModifyChapters"}
+
+
+def split_postprocessors(postprocessors: list[dict]) -> tuple[list[dict], list[dict]]:
+    inline = [pp for pp in postprocessors if pp["key"] not in DEFERRED_POSTPROCESSORS]
+    deferred = [pp for pp in postprocessors if pp["key"] in DEFERRED_POSTPROCESSORS]
+    return inline, deferred
+
+
+def run_postprocessor(spec: dict, info: dict) -> dict:
+    import yt_dlp
+
+    opts = {"quiet": True, "no_warnings": True, "postprocessors": [spec]}
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.run_all_pps("post_process", info)
+    info.pop("__files_to_move", None)
+    return yt_dlp.YoutubeDL.sanitize_info(info)
+
+
+def run_postprocessors(specs: list[dict], info: dict,
+                       on_stage: Optional[Callable[[str], None]] = None) -> dict:
+    for spec in specs:
+        if on_stage:
+            on_stage(spec["key"])
+        info = run_postprocessor(spec, info)
+    return info
+
+
+class PostProcessPool:
+    def __init__(self, max_workers: int = 0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers are spawned rather than forked: the parent runs Tk and download threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        # A worker that died (OOM, killed) breaks the whole executor; the next
+        # stage gets a fresh one.
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_stage(self, spec: dict, info: dict) -> tuple[ProcessPoolExecutor, Future]:
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(run_postprocessor, spec, info)
+        except BrokenProcessPool:
+            self._discard(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(run_postprocessor, spec, info)
+
+    def submit(self, specs: list[dict], info: dict,
+               on_stage: Optional[Callable[[str], None]] = None,
+               cancel_event: Optional[threading.Event] = None) -> Future:
+        result: Future = Future()
+        self._run_next(list(specs), info, result, on_stage, cancel_event)
+        return result
+
+    def _run_next(self, specs: list[dict], info: dict, result: Future,
+                  on_stage: Optional[Callable[[str], None]],
+                  cancel_event: Optional[threading.Event], retried: bool = False):
+        if cancel_event and cancel_event.is_set():
+            result.set_result(None)
+            return
+        if not specs:
+            result.set_result(info)
+            return
+        spec = specs[0]
+        if on_stage and not retried:
+            on_stage(spec["key"])
+        try:
+            executor, stage = self._submit_stage(spec, info)
+        except Exception as e:
+            result.set_exception(e)
+            return
+
+        def _stage_done(f: Future):
+            try:
+                next_info = f.result()
+            except BrokenProcessPool as e:
+                self._discard(executor)
+                # Every stage running in the pool fails with it, not just the one whose
+                # worker died; run it once more before giving up on this task.
+                if retried:
+                    result.set_exception(e)
+                else:
+                    self._run_next(specs, info, result, on_stage, cancel_event, retried=True)
+                return
+            except Exception as e:
+                result.set_exception(e)
+                return
+            self._run_next(specs[1:], next_info, result, on_stage, cancel_event)
+
+        stage.add_done_callback(_stage_done)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import signal
+import sys
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import urlparse
+
+from .archive import DownloadArchive
+from .cli import build_manager
+from .config import Config, DownloadHistory, _config_dir
+from .downloader import DownloadManager, DownloadProgress, QueueChange, QueueItem
+from .events import TERMINAL_STATES, ProgressChannel, progress_fields
+from .journal import QueueJournal
+
+_MAX_BODY = 1024 * 1024
+_HEARTBEAT = 15.0
+_FINISHED = ("complete", "error", "cancelled")
+_ENQUEUE_FIELDS = {
+    "output_dir": str,
+    "title": str,
+    "fmt": str,
+    "quality": str,
+    "audio_format": str,
+    "embed_thumbnail": bool,
+    "sponsorblock": bool,
+}
+_FORMATS = ("video", "audio")
+_LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+def _host_name(host: str) -> str:
+    if host.startswith("["):
+        return host[1:].partition("]")[0]
+    return host.rpartition(":")[0] if host.count(":") == 1 else host
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class _Subscriber:
+    def __init__(self):
+        # Progress for a task is coalesced to its latest snapshot; terminal and
+        # queue events are kept in order. A slow client never grows a backlog
+        # of stale progress.
+        self.latest: dict[str, dict] = {}
+        self.ordered: list[tuple[str, dict]] = []
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def push(self, event: str, data: dict, coalesce: bool):
+        if coalesce:
+            self.latest[data["task_id"]] = data
+        else:
+            self.latest.pop(data.get("task_id"), None)
+            self.ordered.append((event, data))
+        self.ready.set()
+
+    def take(self) -> list[tuple[str, dict]]:
+        events = self.ordered + [("progress", d) for d in self.latest.values()]
+        self.ordered, self.latest = [], {}
+        self.ready.clear()
+        return events
+
+
+class JobServer:
+    def __init__(self, dm: DownloadManager, defaults: Optional[dict] = None,
+                 progress_hz: int = 10):
+        self.dm = dm
+        self.defaults = defaults or {}
+        self._interval = 1 / max(1, progress_hz)
+        self._channel = ProgressChannel()
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._progress: dict[str, DownloadProgress] = {}
+        # Subscribers keyed by task id; None holds those following every task.
+        self._subscribers: dict[Optional[str], set[_Subscriber]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._handlers: set[asyncio.Task] = set()
+        self._allowed_hosts = set(_LOCAL_HOSTS)
+        dm.on_progress = self._channel.publish
+        dm.on_queue_change = self._channel.post
+        dm.on_complete = lambda task_id, path, meta: self._results.put(
+            ("complete", dict(task_id=task_id, path=path, **meta)))
+        dm.on_error = lambda task_id, error: self._results.put(
+            ("error", dict(task_id=task_id, error=error)))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0,
+                    unix_path: Optional[str] = None):
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._allowed_hosts.add(host.lower())
+            self._server = await asyncio.start_server(self._handle, host, port)
+        self._pump_task = asyncio.create_task(self._pump())
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._pump_task:
+            self._pump_task.cancel()
+        if self._server:
+            self._server.close()
+        for subs in self._subscribers.values():
+            for sub in subs:
+                sub.closed = True
+                sub.ready.set()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+
+    # Fan-out
+
+    async def _pump(self):
+        while True:
+            self._dispatch()
+            await asyncio.sleep(self._interval)
+
+    def _dispatch(self):
+        for event in self._channel.drain_queue_events():
+            item = event.item
+            if event.change is QueueChange.REMOVED:
+                self._progress.pop(item.task_id, None)
+            self._broadcast(item.task_id, "queue", {
+                "task_id": item.task_id, "change": event.change.name.lower(),
+                "url": item.url, "title": item.title, "state": item.state.name.lower()})
+        for task_id, progress in self._channel.drain():
+            self._progress[task_id] = progress
+            self._broadcast(task_id, "progress", dict(task_id=task_id, **progress_fields(progress)),
+                            coalesce=progress.state not in TERMINAL_STATES)
+        while not self._results.empty():
+            event, data = self._results.get()
+            self._broadcast(data["task_id"], event, data)
+
+    def _broadcast(self, task_id: str, event: str, data: dict, coalesce: bool = False):
+        for key in (task_id, None):
+            for sub in self._subscribers.get(key, ()):
+                sub.push(event, data, coalesce)
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            await self._route(method, path, headers, body, reader, writer)
+        except _HTTPError as e:
+            self._respond(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _readline(reader: asyncio.StreamReader) -> str:
+        try:
+            return (await reader.readline()).decode("latin-1")
+        except (ValueError, asyncio.LimitOverrunError):
+            # Longer than the stream's buffer limit.
+            raise _HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+    @classmethod
+    async def _read_request(cls, reader: asyncio.StreamReader) -> tuple[str, str, dict, bytes]:
+        request_line = (await cls._readline(reader)).split()
+        if len(request_line) != 3:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST)
+        headers = {}
+        while True:
+            line = await cls._readline(reader)
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        if length < 0:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        if length > _MAX_BODY:
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return request_line[0].upper(), urlparse(request_line[1]).path, headers, body
+
+    async def _route(self, method: str, path: str, headers: dict, body: bytes,
+                     reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # A DNS-rebinding page reaches us under its own host name; only answer to ours.
+        if _host_name(headers.get("host", "").lower()) not in self._allowed_hosts:
+            raise _HTTPError(HTTPStatus.FORBIDDEN, "unexpected Host header")
+        parts = [p for p in path.split("/") if p]
+        if parts == ["jobs"] and method == "GET":
+            self._respond(writer, HTTPStatus.OK, [self._job_fields(i) for i in self.dm.queue_snapshot()])
+        elif parts == ["jobs"] and method == "POST":
+            result = self._enqueue(headers, body)
+            self._respond(writer, HTTPStatus.OK if result.get("archived") else HTTPStatus.CREATED,
+                          result)
+        elif parts == ["events"] and method == "GET":
+            await self._stream(reader, writer, None)
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            job = self._job(parts[1])
+            if job is None:
+                raise _HTTPError(HTTPStatus.NOT_FOUND, "no such job")
+            self._respond(writer, HTTPStatus.OK, job)
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "DELETE":
+            if self._job(parts[1]) is None:
+                raise _HTTPError(HTTPStatus.NOT_FOUND, "no such job")
+            self.dm.cancel(parts[1])
+            self._respond(writer, HTTPStatus.ACCEPTED, {"task_id": parts[1]})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and method == "GET":
+            await self._stream(reader, writer, parts[1])
+        elif parts and parts[0] in ("jobs", "events"):
+            raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        else:
+            raise _HTTPError(HTTPStatus.NOT_FOUND)
+
+    def _job(self, task_id: str) -> Optional[dict]:
+        item = self.dm.queue_item(task_id)
+        return self._job_fields(item) if item else None
+
+    def _job_fields(self, item: QueueItem) -> dict:
+        job = {"task_id": item.task_id, "url": item.url, "title": item.title,
+               "state": item.state.name.lower()}
+        progress = self._progress.get(item.task_id)
+        if progress:
+            job["progress"] = progress_fields(progress)
+        return job
+
+    def _enqueue(self, headers: dict, body: bytes) -> dict:
+        # Requiring a JSON content type means a web page can't submit jobs with a
+        # plain cross-site form post; browsers preflight it and we never allow it.
+        if not headers.get("content-type", "").startswith("application/json"):
+            raise _HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "expected application/json")
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "invalid JSON")
+        if not isinstance(request, dict) or not isinstance(request.get("url"), str):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "missing url")
+        for name, kind in dict(_ENQUEUE_FIELDS, playlist=bool).items():
+            if name in request and not isinstance(request[name], kind):
+                raise _HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be {kind.__name__}")
+        if request.get("fmt", "video") not in _FORMATS:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "fmt must be video or audio")
+        options = {k: v for k, v in self.defaults.items() if k in _ENQUEUE_FIELDS}
+        options.update({k: request[k] for k in _ENQUEUE_FIELDS if k in request})
+        options["output_dir"] = self._output_dir(request.get("output_dir"))
+        if request.get("playlist"):
+            options.pop("title", None)
+            return {"playlist_id": self.dm.enqueue_playlist(request["url"], **options)}
+        task_id = self.dm.enqueue(request["url"], **options)
+        if task_id is None:
+            return {"task_id": None, "archived": True}
+        return {"task_id": task_id}
+
+    def _output_dir(self, requested: Optional[str]) -> str:
+        # Clients may only pick a directory inside the configured download directory.
+        root = os.path.realpath(os.path.expanduser(self.defaults.get("output_dir") or "."))
+        if not requested:
+            return root
+        path = os.path.realpath(os.path.join(root, os.path.expanduser(requested)))
+        if os.path.commonpath((root, path)) != root:
+            raise _HTTPError(HTTPStatus.FORBIDDEN, "output_dir must be inside the download directory")
+        return path
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body)
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      task_id: Optional[str]):
+        job = self._job(task_id) if task_id else None
+        if task_id and job is None:
+            raise _HTTPError(HTTPStatus.NOT_FOUND, "no such job")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        sub = _Subscriber()
+        if job:
+            if job["state"] in _FINISHED:
+                writer.write(f"event: job\ndata: {json.dumps(job)}\n\n".encode())
+                return
+            if "progress" in job:
+                sub.push("progress", dict(task_id=task_id, **job["progress"]), coalesce=True)
+        self._subscribers.setdefault(task_id, set()).add(sub)
+        # Clients send nothing after the request, so a completed read means they hung up.
+        hangup = asyncio.ensure_future(reader.read(1))
+        ready: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if ready is None:
+                    ready = asyncio.ensure_future(sub.ready.wait())
+                done, _ = await asyncio.wait((ready, hangup), timeout=_HEARTBEAT,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if hangup in done or sub.closed:
+                    return
+                if ready not in done:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    continue
+                ready = None
+                for event, data in sub.take():
+                    writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                    if task_id and event in ("complete", "error"):
+                        return
+                    # Cancelling a job that hasn't started only changes its queue state.
+                    if task_id and event in ("progress", "queue") and data["state"] == "cancelled":
+                        return
+                await writer.drain()
+        finally:
+            hangup.cancel()
+            if ready is not None:
+                ready.cancel()
+            subs = self._subscribers.get(task_id)
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[task_id]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    config = Config()
+    parser = argparse.ArgumentParser(
+        prog="streamsniper-daemon",
+        description="Serve a local HTTP/JSON API for queueing downloads.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=config.get("api_port"))
+    parser.add_argument("--unix-socket", metavar="PATH")
+    parser.add_argument("-j", "--jobs", type=int, default=config.get("max_concurrent_downloads"))
+    parser.add_argument("--per-host", type=int, default=config.get("max_downloads_per_host"))
+    args = parser.parse_args(argv)
+
+    # The daemon keeps its own journal so it never resumes the GUI's queue, or vice versa.
+    dm = build_manager(config, args.jobs, args.per_host,
+                       journal=QueueJournal(_config_dir() / "daemon.journal"),
+                       archive=DownloadArchive())
+    history = DownloadHistory()
+    server = JobServer(dm, defaults={
+        "output_dir": config.get("download_dir"),
+        "fmt": config.get("format"),
+        "quality": config.get("quality"),
+        "audio_format": config.get("audio_format"),
+        "embed_thumbnail": config.get("embed_thumbnail"),
+        "sponsorblock": config.get("sponsorblock"),
+    }, progress_hz=config.get("progress_update_hz"))
+    record = dm.on_complete
+
+    def on_complete(task_id: str, path: str, meta: dict):
+        record(task_id, path, meta)
+        history.add(url=meta["url"], title=meta["title"], filename=path.rsplit("/", 1)[-1],
+                    path=path, fmt=meta["format"], quality=meta["quality"],
+                    filesize_mb=meta["filesize_mb"], duration=meta["duration"],
+                    uploader=meta["uploader"], extractor=meta["extractor"],
+                    video_id=meta["video_id"])
+
+    dm.on_complete = on_complete
+
+    async def run():
+        dm.restore()
+        await server.start(args.host, args.port, args.unix_socket)
+        where = args.unix_socket or f"http://{args.host}:{server.port}"
+        print(f"streamsniper-daemon listening on {where}", file=sys.stderr)
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.cancel)
+            except NotImplementedError:
+                pass
+        try:
+            await stop
+        except asyncio.CancelledError:
+            pass
+        await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    dm.cancel_active()
+    dm.shutdown()
+    config.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import functools
 import os
 import subprocess
 import sys
@@ -6,9 +7,10 @@ import tkinter as tk
 from tkinter import ttk
 
 from .. import theme
+from ..events import TERMINAL_STATES
 from ..downloader import (DownloadManager, DownloadProgress, DownloadState,
-                          Downloader, QueueItem, VideoInfo)
-from ..widgets import StatusBar, ThumbnailPreview
+                          PlaylistPager, QueueChange, QueueEvent, VideoInfo)
+from ..widgets import PlaylistBrowser, StatusBar, ThumbnailPreview
 
 STATE_ICONS = {
     DownloadState.QUEUED: "queued",
@@ -30,6 +32,12 @@ class DownloadTab(ttk.Frame):
         self._current_info: VideoInfo | None = None
         self._extracting = False
         self._downloading = False
+        # Tasks with live progress, oldest first.
+        self._running: dict[str, None] = {}
+        # Queue items that haven't finished, as reported by queue events, and
+        # playlists still being read.
+        self._unfinished: set[str] = set()
+        self._ingesting: set[str] = set()
 
         self._build_ui()
 
@@ -91,6 +99,10 @@ class DownloadTab(ttk.Frame):
         ttk.Label(meta_frame, textvariable=self.playlist_var,
                   style="Secondary.TLabel").pack(side=tk.LEFT, padx=(16, 0))
 
+        # Playlist entries, shown only for playlists
+        self._info_frame = info_frame
+        self.playlist_browser = PlaylistBrowser(container, on_select=self._on_playlist_select)
+
         # Format controls + SponsorBlock
         fmt_frame = ttk.Frame(container, style="TFrame")
         fmt_frame.pack(fill=tk.X, pady=(0, 10))
@@ -113,6 +125,9 @@ class DownloadTab(ttk.Frame):
         self.sponsorblock_var = tk.BooleanVar(value=self.config.get("sponsorblock"))
         ttk.Checkbutton(fmt_frame, text="SponsorBlock", variable=self.sponsorblock_var,
                         style="TCheckbutton").pack(side=tk.LEFT)
+        self.config.subscribe("format", self.format_var.set)
+        self.config.subscribe("quality", self.quality_var.set)
+        self.config.subscribe("sponsorblock", self.sponsorblock_var.set)
 
         # Download button row
         btn_frame = ttk.Frame(container, style="TFrame")
@@ -144,8 +159,14 @@ class DownloadTab(ttk.Frame):
                   style="Secondary.TLabel").pack(anchor=tk.W, pady=(0, 8))
 
         # Queue display
-        queue_label = ttk.Label(container, text="Queue", style="Heading.TLabel")
-        queue_label.pack(anchor=tk.W, pady=(0, 4))
+        queue_header = ttk.Frame(container, style="TFrame")
+        queue_header.pack(fill=tk.X, pady=(0, 4))
+        ttk.Label(queue_header, text="Queue", style="Heading.TLabel").pack(side=tk.LEFT)
+        ttk.Button(queue_header, text="Clear Finished", style="Secondary.TButton",
+                   command=self._clear_finished).pack(side=tk.RIGHT)
+        self.hidden_var = tk.StringVar()
+        ttk.Label(queue_header, textvariable=self.hidden_var,
+                  style="Secondary.TLabel").pack(side=tk.RIGHT, padx=8)
 
         queue_frame = ttk.Frame(container, style="Card.TFrame")
         queue_frame.pack(fill=tk.BOTH, expand=True)
@@ -183,12 +204,13 @@ class DownloadTab(ttk.Frame):
         self.duration_var.set("")
         self.playlist_var.set("")
         self.thumbnail.clear()
+        self.playlist_browser.clear()
+        self.playlist_browser.pack_forget()
         threading.Thread(target=self._extract_info, args=(url,), daemon=True).start()
 
     def _extract_info(self, url: str):
         try:
-            dl = Downloader()
-            info = dl.extract_info(url)
+            info = self.dm.downloader.extract_info(url)
             self.after(0, self._update_info, info)
         except Exception as e:
             self.after(0, self._extract_error, str(e))
@@ -201,8 +223,10 @@ class DownloadTab(ttk.Frame):
         self.uploader_var.set(info.uploader)
         self.duration_var.set(info.duration)
         if info.is_playlist:
-            self.playlist_var.set(f"Playlist: {info.playlist_count} videos")
-            self.download_btn.configure(text=f"Download All ({info.playlist_count})")
+            self.playlist_var.set(f"Playlist: {info.playlist_count} videos"
+                                  if info.playlist_count else "Playlist")
+            self.playlist_browser.pack(fill=tk.X, pady=(0, 12), after=self._info_frame)
+            self.playlist_browser.show(PlaylistPager(self.dm.downloader, info.url))
         else:
             self.playlist_var.set("")
             self.download_btn.configure(text="Download")
@@ -213,6 +237,17 @@ class DownloadTab(ttk.Frame):
             available = ["best"] + [f"{h}p" for h in info.formats if h]
             self.quality_combo.configure(values=available)
 
+    def _on_playlist_select(self, count: int):
+        info = self._current_info
+        if not info or not info.is_playlist:
+            return
+        if count:
+            self.download_btn.configure(text=f"Download Selected ({count})")
+        elif info.playlist_count:
+            self.download_btn.configure(text=f"Download All ({info.playlist_count})")
+        else:
+            self.download_btn.configure(text="Download All")
+
     def _extract_error(self, error: str):
         self._extracting = False
         self.fetch_btn.configure(state=tk.NORMAL)
@@ -232,22 +267,41 @@ class DownloadTab(ttk.Frame):
         embed_thumbnail = self.config.get("embed_thumbnail")
         sponsorblock = self.sponsorblock_var.get()
 
-        if info and info.is_playlist and info.entries:
-            for entry in info.entries:
-                self.dm.enqueue(
-                    url=entry.url,
-                    output_dir=output_dir,
-                    title=entry.title,
-                    fmt=fmt,
-                    quality=quality,
-                    audio_format=audio_format,
-                    embed_thumbnail=embed_thumbnail,
-                    sponsorblock=sponsorblock,
-                )
-            self.status_var.set(f"Queued {len(info.entries)} videos")
+        selected = self.playlist_browser.selected_entries() if info and info.is_playlist else []
+        if selected:
+            queued = sum(self.dm.enqueue(
+                url=entry.url,
+                output_dir=output_dir,
+                title=entry.title,
+                fmt=fmt,
+                quality=quality,
+                audio_format=audio_format,
+                embed_thumbnail=embed_thumbnail,
+                sponsorblock=sponsorblock,
+                key=entry.video_key,
+            ) is not None for entry in selected)
+            if not queued:
+                self.status_var.set("Already downloaded")
+                return
+            skipped = len(selected) - queued
+            self.status_var.set(f"Queued {queued} videos"
+                                + (f", {skipped} already downloaded" if skipped else ""))
+        elif info and info.is_playlist:
+            playlist_id = self.dm.enqueue_playlist(
+                url=url,
+                output_dir=output_dir,
+                fmt=fmt,
+                quality=quality,
+                audio_format=audio_format,
+                embed_thumbnail=embed_thumbnail,
+                sponsorblock=sponsorblock,
+            )
+            self._ingesting.add(playlist_id)
+            self.status_var.set("Queueing playlist...")
         else:
             title = info.title if info else ""
-            self.dm.enqueue(
+            reusable = info.raw if info and info.url == url else None
+            task_id = self.dm.enqueue(
                 url=url,
                 output_dir=output_dir,
                 title=title,
@@ -256,7 +310,11 @@ class DownloadTab(ttk.Frame):
                 audio_format=audio_format,
                 embed_thumbnail=embed_thumbnail,
                 sponsorblock=sponsorblock,
+                info=reusable,
             )
+            if task_id is None:
+                self.status_var.set("Already downloaded")
+                return
             self.status_var.set("Starting download...")
 
         self._downloading = True
@@ -265,29 +323,68 @@ class DownloadTab(ttk.Frame):
         self.progress_var.set(0)
 
     def _on_cancel(self):
-        self.dm.cancel_current()
+        selected = self.queue_tree.selection()
+        if selected:
+            for task_id in selected:
+                self.dm.cancel(task_id)
+        else:
+            self.dm.cancel_active()
         self.status_var.set("Cancelling...")
 
+    def _progress_task(self) -> str | None:
+        # The progress bar follows one download: the selected one if it is running,
+        # otherwise the one that has been running longest.
+        for task_id in self.queue_tree.selection():
+            if task_id in self._running:
+                return task_id
+        return next(iter(self._running), None)
+
     def on_progress(self, task_id: str, progress: DownloadProgress):
+        shown = task_id == self._progress_task()
+        if progress.state in TERMINAL_STATES:
+            self._running.pop(task_id, None)
+            if shown and progress.state is DownloadState.CANCELLED:
+                self.status_var.set("Cancelled")
+                self.status_bar.clear()
+            # COMPLETE and ERROR are reported by on_complete / on_error, which run
+            # before the pump delivers this.
+            return
+        self._running.setdefault(task_id)
+        if task_id != self._progress_task():
+            return
         self.progress_var.set(progress.percent)
         state_text = {
+            DownloadState.QUEUED: f"Retrying: {progress.error[:80]}" if progress.stage == "retry" else "Queued",
             DownloadState.EXTRACTING: "Extracting...",
             DownloadState.DOWNLOADING: f"Downloading... {progress.percent:.0f}%",
-            DownloadState.PROCESSING: "Processing...",
-            DownloadState.CANCELLED: "Cancelled",
+            DownloadState.PROCESSING: f"Processing ({progress.stage})..." if progress.stage else "Processing...",
         }
         self.status_var.set(state_text.get(progress.state, str(progress.state.name)))
         self.status_bar.update_stats(progress.speed, progress.eta,
                                       f"{progress.downloaded} / {progress.total}")
 
+    def on_playlist_progress(self, playlist_id: str, count: int, skipped: int, done: bool):
+        already = f", {skipped} already downloaded" if skipped else ""
+        if done:
+            self._ingesting.discard(playlist_id)
+            self.playlist_var.set(f"Playlist: {count + skipped} videos")
+            self.status_var.set(f"Queued {count} videos{already}")
+            # A playlist whose entries were all archived, or that was empty, queues
+            # nothing, so no queue event would re-enable the buttons.
+            self._sync_buttons()
+        else:
+            self._ingesting.add(playlist_id)
+            self.playlist_var.set(f"Playlist: {count} videos queued{already}...")
+
     def on_complete(self, task_id: str, filepath: str, meta: dict):
         self.progress_var.set(100)
         self.status_var.set(f"Complete: {os.path.basename(filepath)}")
         self.status_bar.clear()
 
         title = meta.get("title") or (self._current_info.title if self._current_info else os.path.basename(filepath))
-        duration = self._current_info.duration if self._current_info else ""
-        self.history.add(
+        duration = meta.get("duration") or (self._current_info.duration if self._current_info else "")
+        record = functools.partial(
+            self.history.add,
             url=meta.get("url", ""),
             title=title,
             filename=os.path.basename(filepath),
@@ -296,29 +393,66 @@ class DownloadTab(ttk.Frame):
             quality=meta.get("quality", ""),
             filesize_mb=meta.get("filesize_mb", 0),
             duration=duration,
+            uploader=meta.get("uploader", ""),
+            extractor=meta.get("extractor", ""),
+            video_id=meta.get("video_id", ""),
         )
-
-        if self.dm._queue.empty():
-            self._downloading = False
-            self.download_btn.configure(state=tk.NORMAL, text="Download")
-            self.cancel_btn.configure(state=tk.DISABLED)
+        if self.history.ready:
+            record()
+        else:
+            # History is still loading at startup; wait for it off the UI thread.
+            threading.Thread(target=record, daemon=True).start()
 
     def on_error(self, task_id: str, error: str):
         self.status_var.set(f"Error: {error[:100]}")
         self.status_bar.clear()
+        if self._progress_task() in (None, task_id):
+            self.progress_var.set(0)
 
-        if self.dm._queue.empty():
+    def _sync_buttons(self):
+        # Driven by queue events rather than dm.is_idle(): the completion callbacks
+        # can run before the worker has released the task.
+        if self._downloading and not self._unfinished and not self._ingesting:
             self._downloading = False
             self.download_btn.configure(state=tk.NORMAL, text="Download")
             self.cancel_btn.configure(state=tk.DISABLED)
-            self.progress_var.set(0)
 
-    def on_queue_update(self, items: list[QueueItem]):
-        self.queue_tree.delete(*self.queue_tree.get_children())
-        for item in items:
+    def _clear_finished(self):
+        self.dm.clear_finished()
+        self.hidden_var.set("")
+
+    def _update_hidden(self):
+        evicted = self.dm.evicted_counts()
+        total = sum(evicted.values())
+        failed = evicted.get(DownloadState.ERROR, 0)
+        text = f"{total} finished hidden" if total else ""
+        if failed:
+            text += f" ({failed} failed)"
+        self.hidden_var.set(text)
+
+    def on_queue_events(self, events: list[QueueEvent]):
+        removed = False
+        for event in events:
+            item = event.item
+            exists = self.queue_tree.exists(item.task_id)
+            if event.change is QueueChange.REMOVED or item.state in TERMINAL_STATES:
+                self._unfinished.discard(item.task_id)
+            else:
+                self._unfinished.add(item.task_id)
+            if event.change is QueueChange.REMOVED:
+                removed = True
+                if exists:
+                    self.queue_tree.delete(item.task_id)
+                continue
             status_text = STATE_ICONS.get(item.state, item.state.name)
             title = item.title[:80] if item.title else item.url[:80]
-            self.queue_tree.insert("", tk.END, values=(status_text, title))
+            if exists:
+                self.queue_tree.item(item.task_id, values=(status_text, title))
+            else:
+                self.queue_tree.insert("", tk.END, iid=item.task_id, values=(status_text, title))
+        if removed:
+            self._update_hidden()
+        self._sync_buttons()
 
     def _open_download_folder(self):
         path = self.config.get("download_dir")
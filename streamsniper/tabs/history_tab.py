@@ -2,18 +2,37 @@ import os
 import subprocess
 import sys
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
+from typing import Optional
 
 from .. import theme
+from ..archive import DownloadArchive, archive_keys
 from ..config import DownloadHistory
 
+_SEARCH_DEBOUNCE_MS = 150
+_PAGE_SIZE = 200
+# Fetch the next page once the view is scrolled past this fraction of the loaded rows.
+_PAGE_THRESHOLD = 0.8
+
 
 class HistoryTab(ttk.Frame):
-    def __init__(self, parent, history: DownloadHistory):
+    def __init__(self, parent, history: DownloadHistory,
+                 archive: Optional[DownloadArchive] = None):
         super().__init__(parent, style="TFrame")
         self.history = history
+        self.archive = archive
         self._sort_col = "date"
         self._sort_reverse = True
+        self._search_after = None
+        # Rows loaded so far, one page at a time, in display order.
+        self._entries: list[dict] = []
+        self._exhausted = False
+        self._fetching = False
+        self._loaded: Optional[tuple[int, str]] = None
+        # A single loader thread keeps history queries off the UI thread and in order.
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._load_token = 0
         self._build_ui()
         self._refresh()
 
@@ -27,10 +46,14 @@ class HistoryTab(ttk.Frame):
 
         ttk.Label(search_frame, text="Search", style="TLabel").pack(side=tk.LEFT, padx=(0, 8))
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", lambda *_: self._refresh())
+        self.search_var.trace_add("write", lambda *_: self._schedule_refresh())
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=theme.FONT)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 8))
 
+        self.count_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.count_var, style="Secondary.TLabel").pack(
+            side=tk.LEFT, padx=(0, 8))
+
         ttk.Button(search_frame, text="Clear All", style="Secondary.TButton",
                    command=self._clear_all).pack(side=tk.RIGHT)
 
@@ -51,11 +74,11 @@ class HistoryTab(ttk.Frame):
         self.tree.column("size", width=80, minwidth=60)
         self.tree.column("path", width=250, minwidth=100)
 
-        scrollbar = ttk.Scrollbar(container, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(container, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
 
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Right-click menu
         self.context_menu = tk.Menu(self, tearoff=0, bg=theme.BG_CARD,
@@ -70,11 +93,56 @@ class HistoryTab(ttk.Frame):
         self.tree.bind("<Button-2>", self._show_context)
         self.tree.bind("<Button-3>", self._show_context)
 
+    def _schedule_refresh(self):
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(_SEARCH_DEBOUNCE_MS, self._refresh)
+
     def _refresh(self):
-        self.tree.delete(*self.tree.get_children())
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+            self._search_after = None
         q = self.search_var.get().strip()
-        entries = self.history.search(q) if q else self.history.all()
-        for entry in entries:
+        self._loaded = (self.history.generation, q)
+        self._load_token += 1
+        self._fetch_page(0)
+
+        token = self._load_token
+
+        def _count():
+            # Queued after the first page, so counting never delays the rows.
+            if token == self._load_token:
+                count = self.history.count(q)
+                self.after(0, self._on_counted, token, count, q)
+
+        self._loader.submit(_count)
+
+    def _fetch_page(self, offset: int):
+        # Pages are read from the database as the view scrolls; only the rows
+        # fetched so far are held in memory.
+        self._fetching = True
+        token = self._load_token
+        q = self._loaded[1]
+        sort, descending = self._sort_col, self._sort_reverse
+
+        def _load():
+            if token == self._load_token:
+                rows = self.history.search(q, _PAGE_SIZE, offset, sort, descending)
+                self.after(0, self._on_loaded, token, offset, rows)
+
+        self._loader.submit(_load)
+
+    def _on_loaded(self, token: int, offset: int, rows: list[dict]):
+        if token != self._load_token:
+            return  # superseded by a newer query
+        if offset == 0:
+            self._entries = []
+            self.tree.delete(*self.tree.get_children())
+            self.tree.yview_moveto(0)
+        self._fetching = False
+        self._exhausted = len(rows) < _PAGE_SIZE
+        self._entries.extend(rows)
+        for entry in rows:
             ts = entry.get("timestamp", "")[:16].replace("T", " ")
             self.tree.insert("", tk.END, values=(
                 ts,
@@ -84,26 +152,30 @@ class HistoryTab(ttk.Frame):
                 entry.get("path", ""),
             ))
 
+    def _on_counted(self, token: int, count: int, query: str):
+        if token == self._load_token:
+            self.count_var.set(f"{count} {'matches' if query else 'entries'}")
+
+    def _on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        if not (self._exhausted or self._fetching) and float(last) >= _PAGE_THRESHOLD:
+            self._fetch_page(len(self._entries))
+
     def _sort(self, col: str):
         if self._sort_col == col:
             self._sort_reverse = not self._sort_reverse
         else:
             self._sort_col = col
             self._sort_reverse = True
-        items = [(self.tree.set(k, col), k) for k in self.tree.get_children("")]
-        items.sort(reverse=self._sort_reverse)
-        for idx, (_, k) in enumerate(items):
-            self.tree.move(k, "", idx)
+        self._refresh()
 
     def _selected_entry(self):
         sel = self.tree.selection()
         if not sel:
             return None, None
         idx = self.tree.index(sel[0])
-        q = self.search_var.get().strip()
-        entries = self.history.search(q) if q else self.history.all()
-        if 0 <= idx < len(entries):
-            return idx, entries[idx]
+        if 0 <= idx < len(self._entries):
+            return idx, self._entries[idx]
         return None, None
 
     def _show_context(self, event):
@@ -142,14 +214,25 @@ class HistoryTab(ttk.Frame):
             self.clipboard_append(entry.get("url", ""))
 
     def _delete_entry(self):
-        idx, _ = self._selected_entry()
-        if idx is not None:
-            self.history.remove(idx)
+        _, entry = self._selected_entry()
+        if entry is not None:
+            # Runs on the loader thread, ahead of the reload, in case history is still loading.
+            self._loader.submit(self.history.remove_id, entry["id"])
+            # Deleting an entry makes the video downloadable again.
+            if self.archive is not None:
+                video_key = (f"{entry['extractor'].lower()} {entry['video_id']}"
+                             if entry.get("extractor") and entry.get("video_id") else None)
+                # The URL key as well, which older archives stored next to the id.
+                self.archive.discard({*archive_keys(entry.get("url", ""), video_key),
+                                      *archive_keys(entry.get("url", ""))})
             self._refresh()
 
     def _clear_all(self):
-        self.history.clear()
+        self._loader.submit(self.history.clear)
+        if self.archive is not None:
+            self.archive.clear()
         self._refresh()
 
     def reload(self):
-        self._refresh()
+        if self._loaded != (self.history.generation, self.search_var.get().strip()):
+            self._refresh()
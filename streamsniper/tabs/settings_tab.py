@@ -3,13 +3,16 @@ from tkinter import filedialog, ttk
 
 from .. import theme
 from ..config import Config
+from ..downloader import DownloadManager
 
 
 class SettingsTab(ttk.Frame):
-    def __init__(self, parent, config: Config):
+    def __init__(self, parent, config: Config, download_manager: DownloadManager | None = None):
         super().__init__(parent, style="TFrame")
         self.config = config
+        self.dm = download_manager
         self._build_ui()
+        self._bind_config()
 
     def _build_ui(self):
         container = ttk.Frame(self, style="TFrame")
@@ -79,27 +82,59 @@ class SettingsTab(ttk.Frame):
 
         # SponsorBlock
         sb_frame = ttk.Frame(container, style="TFrame")
-        sb_frame.pack(fill=tk.X, pady=(0, 24))
+        sb_frame.pack(fill=tk.X, pady=(0, 16))
 
         self.sb_var = tk.BooleanVar(value=self.config.get("sponsorblock"))
         ttk.Checkbutton(sb_frame, text="Enable SponsorBlock (skip sponsors, intros, outros)",
                         variable=self.sb_var).pack(anchor=tk.W)
         self.sb_var.trace_add("write", lambda *_: self.config.set("sponsorblock", self.sb_var.get()))
 
+        # Concurrency
+        conc_frame = ttk.Frame(container, style="TFrame")
+        conc_frame.pack(fill=tk.X, pady=(0, 24))
+        conc_row = ttk.Frame(conc_frame, style="TFrame")
+        conc_row.pack(anchor=tk.W)
+
+        ttk.Label(conc_row, text="Parallel downloads", style="TLabel").pack(side=tk.LEFT, padx=(0, 8))
+        self.workers_var = tk.StringVar(value=str(self.config.get("max_concurrent_downloads")))
+        ttk.Combobox(conc_row, textvariable=self.workers_var,
+                     values=[str(n) for n in range(1, 9)],
+                     state="readonly", width=4).pack(side=tk.LEFT, padx=(0, 24))
+        self.workers_var.trace_add("write", lambda *_: self._apply_concurrency())
+
+        ttk.Label(conc_row, text="Per site", style="TLabel").pack(side=tk.LEFT, padx=(0, 8))
+        self.per_host_var = tk.StringVar(value=str(self.config.get("max_downloads_per_host")))
+        ttk.Combobox(conc_row, textvariable=self.per_host_var,
+                     values=[str(n) for n in range(1, 9)],
+                     state="readonly", width=4).pack(side=tk.LEFT)
+        self.per_host_var.trace_add("write", lambda *_: self._apply_concurrency())
+
         # Reset
         ttk.Button(container, text="Reset to Defaults", style="Secondary.TButton",
                    command=self._reset).pack(anchor=tk.W)
 
+    def _apply_concurrency(self):
+        workers = int(self.workers_var.get())
+        per_host = int(self.per_host_var.get())
+        self.config.set("max_concurrent_downloads", workers)
+        self.config.set("max_downloads_per_host", per_host)
+        if self.dm:
+            self.dm.set_concurrency(workers, per_host)
+
     def _browse_dir(self):
         d = filedialog.askdirectory(initialdir=self.dir_var.get())
         if d:
             self.dir_var.set(d)
 
+    def _bind_config(self):
+        for key, var in (("download_dir", self.dir_var), ("format", self.format_var),
+                         ("quality", self.quality_var), ("audio_format", self.audio_var),
+                         ("embed_thumbnail", self.thumb_var), ("sponsorblock", self.sb_var)):
+            self.config.subscribe(key, var.set)
+        self.config.subscribe("max_concurrent_downloads",
+                              lambda v: self.workers_var.set(str(v)))
+        self.config.subscribe("max_downloads_per_host",
+                              lambda v: self.per_host_var.set(str(v)))
+
     def _reset(self):
         self.config.reset()
-        self.dir_var.set(self.config.get("download_dir"))
-        self.format_var.set(self.config.get("format"))
-        self.quality_var.set(self.config.get("quality"))
-        self.audio_var.set(self.config.get("audio_format"))
-        self.thumb_var.set(self.config.get("embed_thumbnail"))
-        self.sb_var.set(self.config.get("sponsorblock"))
@@ -1,3 +1,4 @@
+import collections
 import sys
 import tkinter as tk
 from tkinter import ttk
@@ -80,6 +81,7 @@ def configure_ttk_styles():
     style.configure("Treeview", background=BG_CARD, foreground=TEXT_PRIMARY,
                      fieldbackground=BG_CARD, borderwidth=0, font=FONT_SMALL,
                      rowheight=32)
+    style.configure("Playlist.Treeview", rowheight=40)
     style.configure("Treeview.Heading", background=BG_DARK, foreground=TEXT_SECONDARY,
                      font=FONT_BOLD, borderwidth=0)
     style.map("Treeview",
@@ -102,19 +104,45 @@ def configure_ttk_styles():
               background=[("active", BG_DARK)])
 
 
-def draw_gradient(canvas: tk.Canvas, width: int, height: int):
-    canvas.delete("gradient")
-    r1, g1, b1 = int(GRADIENT_TOP[1:3], 16), int(GRADIENT_TOP[3:5], 16), int(GRADIENT_TOP[5:7], 16)
-    r2, g2, b2 = int(GRADIENT_BOTTOM[1:3], 16), int(GRADIENT_BOTTOM[3:5], 16), int(GRADIENT_BOTTOM[5:7], 16)
-    bands = max(1, height // 4)
-    band_h = height / bands
-    for i in range(bands):
-        t = i / max(1, bands - 1)
-        r = int(r1 + (r2 - r1) * t)
-        g = int(g1 + (g2 - g1) * t)
-        b = int(b1 + (b2 - b1) * t)
-        color = f"#{r:02x}{g:02x}{b:02x}"
-        y0 = int(i * band_h)
-        y1 = int((i + 1) * band_h) + 1
-        canvas.create_rectangle(0, y0, width, y1, fill=color, outline="", tags="gradient")
-    canvas.tag_lower("gradient")
+_GRADIENT_BUCKET = 128
+_GRADIENT_CACHE_SIZE = 4
+_gradient_cache: collections.OrderedDict[tuple[int, int], tk.PhotoImage] = collections.OrderedDict()
+
+
+def _rgb(color: str) -> tuple[int, int, int]:
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def gradient_image(width: int, height: int) -> tk.PhotoImage:
+    # The width is rounded up to a bucket so horizontal resizes reuse the same
+    # image and the canvas clips the overhang. The height is exact so the last
+    # row, at the window's bottom edge, is GRADIENT_BOTTOM.
+    key = (-(-max(1, width) // _GRADIENT_BUCKET) * _GRADIENT_BUCKET, max(1, height))
+    photo = _gradient_cache.get(key)
+    if photo is not None:
+        _gradient_cache.move_to_end(key)
+        return photo
+    w, h = key
+    top, bottom = _rgb(GRADIENT_TOP), _rgb(GRADIENT_BOTTOM)
+    span = max(1, h - 1)
+    column = " ".join(
+        "{#%02x%02x%02x}" % tuple(int(a + (b - a) * y / span) for a, b in zip(top, bottom))
+        for y in range(h))
+    photo = tk.PhotoImage(width=w, height=h)
+    # A single-pixel column that Tk replicates across the whole width.
+    photo.put(column, to=(0, 0, w, h))
+    _gradient_cache[key] = photo
+    while len(_gradient_cache) > _GRADIENT_CACHE_SIZE:
+        _gradient_cache.popitem(last=False)
+    return photo
+
+
+def draw_gradient(canvas: tk.Canvas, width: int, height: int) -> tk.PhotoImage:
+    photo = gradient_image(width, height)
+    items = canvas.find_withtag("gradient")
+    if items:
+        canvas.itemconfigure(items[0], image=photo)
+    else:
+        canvas.create_image(0, 0, anchor=tk.NW, image=photo, tags="gradient")
+        canvas.tag_lower("gradient")
+    return photo
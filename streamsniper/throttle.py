@@ -0,0 +1,147 @@
+import random
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Iterator, Optional
+
+
+class ErrorKind(Enum):
+    THROTTLED = auto()
+    TRANSIENT = auto()
+    UNAVAILABLE = auto()
+    GEO_BLOCKED = auto()
+    UNKNOWN = auto()
+
+
+RETRYABLE = (ErrorKind.THROTTLED, ErrorKind.TRANSIENT)
+
+# Checked in this order: a geo block or a removed video can also carry a 403 or a
+# network-sounding message, and neither gets better by retrying.
+_MESSAGE_PATTERNS = (
+    (ErrorKind.GEO_BLOCKED, re.compile(
+        r"not (?:made (?:this video )?)?available (?:in|from) your (?:country|region|location)"
+        r"|geo[- ]?restrict|blocked it in your country", re.IGNORECASE)),
+    (ErrorKind.UNAVAILABLE, re.compile(
+        r"video unavailable|private video|has been removed|been terminated|does not exist"
+        r"|no video formats found|unsupported url|members[- ]only|confirm your age"
+        r"|requested format is not available|HTTP Error (?:404|410)", re.IGNORECASE)),
+    (ErrorKind.THROTTLED, re.compile(
+        r"HTTP Error (?:429|403)|too many requests|rate[- ]?limit|confirm you.re not a bot",
+        re.IGNORECASE)),
+    (ErrorKind.TRANSIENT, re.compile(
+        r"HTTP Error 5\d\d|timed? ?out|connection (?:reset|refused|aborted)"
+        r"|temporary failure|name resolution|network is unreachable|remote end closed"
+        r"|incomplete ?read|EOF occurred|broken pipe", re.IGNORECASE)),
+)
+_TRANSIENT_TYPES = {"TimeoutError", "ConnectionError", "IncompleteRead", "TransportError",
+                    "SSLError"}
+
+
+def _chain(error: BaseException) -> Iterator[BaseException]:
+    # yt-dlp wraps the underlying exception in DownloadError.exc_info.
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, "exc_info", None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+
+
+def _status(error: BaseException) -> Optional[int]:
+    for name in ("status", "code"):
+        value = getattr(error, name, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    return None
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    chain = list(_chain(error))
+    for e in chain:
+        names = {cls.__name__ for cls in type(e).__mro__}
+        if "GeoRestrictedError" in names:
+            return ErrorKind.GEO_BLOCKED
+        status = _status(e)
+        if status in (429, 403):
+            return ErrorKind.THROTTLED
+        if status in (404, 410):
+            return ErrorKind.UNAVAILABLE
+        if status is not None and status >= 500:
+            return ErrorKind.TRANSIENT
+    message = " ".join(str(e) for e in chain)
+    for kind, pattern in _MESSAGE_PATTERNS:
+        if pattern.search(message):
+            return kind
+    for e in chain:
+        if _TRANSIENT_TYPES & {cls.__name__ for cls in type(e).__mro__}:
+            return ErrorKind.TRANSIENT
+    return ErrorKind.UNKNOWN
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 300.0) -> float:
+    # Exponential in the attempt number, with the upper half jittered so retries
+    # from tasks that failed together don't arrive together.
+    ceiling = min(cap, base * 2 ** max(0, attempt - 1))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+@dataclass
+class _HostState:
+    limit: float
+    delay: float = 0.0
+    next_start: float = 0.0
+    last_decrease: float = 0.0
+
+
+class HostThrottle:
+    # Additive-increase/multiplicative-decrease per host. A throttling response halves
+    # the host's concurrency and doubles the gap between transfer starts; every
+    # success adds back roughly one slot per window of successes and trims the gap.
+    # Not thread-safe: DownloadManager only calls it with its lock held.
+    def __init__(self, max_per_host: int, min_delay: float = 1.0, max_delay: float = 300.0):
+        self.max_per_host = max(1, max_per_host)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._hosts: dict[str, _HostState] = {}
+
+    def set_max_per_host(self, max_per_host: int):
+        self.max_per_host = max(1, max_per_host)
+        for state in self._hosts.values():
+            state.limit = min(state.limit, self.max_per_host)
+
+    def limit(self, host: str) -> int:
+        state = self._hosts.get(host)
+        return self.max_per_host if state is None else max(1, int(state.limit))
+
+    def ready_at(self, host: str) -> float:
+        state = self._hosts.get(host)
+        return 0.0 if state is None else state.next_start
+
+    def started(self, host: str):
+        state = self._hosts.get(host)
+        if state is not None:
+            state.next_start = time.monotonic() + state.delay
+
+    def record(self, host: str, kind: ErrorKind):
+        if kind is not ErrorKind.THROTTLED:
+            return
+        now = time.monotonic()
+        state = self._hosts.setdefault(host, _HostState(float(self.max_per_host)))
+        # Transfers that were already running report the same episode; count it once.
+        if now < state.last_decrease + max(self.min_delay, state.delay):
+            return
+        state.last_decrease = now
+        state.limit = max(1.0, state.limit / 2)
+        state.delay = min(self.max_delay, max(self.min_delay, state.delay * 2))
+        state.next_start = max(state.next_start, now + state.delay)
+
+    def success(self, host: str):
+        state = self._hosts.get(host)
+        if state is None:
+            return
+        state.limit = min(float(self.max_per_host), state.limit + 1 / state.limit)
+        state.delay = max(0.0, state.delay - self.min_delay)
+        if state.limit >= self.max_per_host and not state.delay:
+            del self._hosts[host]
@@ -0,0 +1,164 @@
+import collections
+import hashlib
+import http.client
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urljoin, urlparse
+
+from .config import _config_dir
+
+_USER_AGENT = "StreamSniper/2.0"
+_TIMEOUT = 10
+_MAX_REDIRECTS = 3
+
+
+class _Connections(threading.local):
+    def __init__(self):
+        self.by_host: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+
+def decode_thumbnail(data: bytes, size: tuple[int, int]):
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    # JPEG draft mode decodes at 1/2, 1/4 or 1/8 scale, never below the requested size.
+    img.draft("RGB", size)
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img.resize(size, Image.LANCZOS)
+
+
+class ThumbnailLoader:
+    def __init__(self, cache_dir: Optional[Path] = None, max_workers: int = 4,
+                 memory_items: int = 128, disk_bytes: int = 64 * 1024 * 1024):
+        self._dir = cache_dir or _config_dir() / "thumbnails"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory: collections.OrderedDict[tuple[str, tuple[int, int]], object] = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._connections = _Connections()
+        self._disk_usage = sum(p.stat().st_size for p in self._dir.iterdir() if p.is_file())
+
+    def get_cached(self, url: str, size: tuple[int, int]):
+        with self._lock:
+            image = self._memory.get((url, size))
+            if image is not None:
+                self._memory.move_to_end((url, size))
+            return image
+
+    def load(self, url: str, size: tuple[int, int],
+             callback: Callable[[object], None]) -> Future:
+        # callback runs on a worker thread with a PIL image, or the raw bytes when
+        # Pillow is missing; it gets None if the thumbnail could not be loaded.
+        def _run():
+            image = self.get_cached(url, size)
+            if image is None:
+                try:
+                    image = self._load(url, size)
+                except Exception:
+                    image = None
+            callback(image)
+
+        return self._executor.submit(_run)
+
+    def _load(self, url: str, size: tuple[int, int]):
+        data = self._read_disk(url)
+        if data is None:
+            data = self._get(url)
+            self._write_disk(url, data)
+        try:
+            image = decode_thumbnail(data, size)
+        except ImportError:
+            image = data
+        with self._lock:
+            self._memory[(url, size)] = image
+            self._memory.move_to_end((url, size))
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return image
+
+    def _disk_path(self, url: str) -> Path:
+        return self._dir / hashlib.sha1(url.encode()).hexdigest()
+
+    def _read_disk(self, url: str) -> Optional[bytes]:
+        path = self._disk_path(url)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        os.utime(path)
+        return data
+
+    def _write_disk(self, url: str, data: bytes):
+        path = self._disk_path(url)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_usage += len(data)
+            if self._disk_usage <= self.disk_bytes:
+                return
+            files = sorted((p for p in self._dir.iterdir() if p.suffix != ".tmp"),
+                           key=lambda p: p.stat().st_mtime)
+            for old in files:
+                if self._disk_usage <= self.disk_bytes * 0.9:
+                    break
+                try:
+                    self._disk_usage -= old.stat().st_size
+                    old.unlink()
+                except OSError:
+                    pass
+
+    def _get(self, url: str, redirects: int = 0) -> bytes:
+        parts = urlparse(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {"User-Agent": _USER_AGENT}
+        # Connections are kept per worker thread and host; a dropped keep-alive
+        # connection is retried once on a fresh socket.
+        for attempt in range(2):
+            conn = self._connections.by_host.get(key)
+            if conn is None:
+                cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                conn = cls(parts.netloc, timeout=_TIMEOUT)
+                self._connections.by_host[key] = conn
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                del self._connections.by_host[key]
+                if attempt:
+                    raise
+        if resp.status in (301, 302, 303, 307, 308) and redirects < _MAX_REDIRECTS:
+            return self._get(urljoin(url, resp.getheader("Location", "")), redirects + 1)
+        if resp.status != 200:
+            raise OSError(f"HTTP {resp.status} for {url}")
+        return body
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_shared: Optional[ThumbnailLoader] = None
+_shared_lock = threading.Lock()
+
+
+def shared_loader() -> ThumbnailLoader:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ThumbnailLoader()
+        return _shared
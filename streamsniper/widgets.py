@@ -1,70 +1,230 @@
-import io
-import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
-from typing import Optional
+from typing import Callable, Optional
 
 from . import theme
+from .downloader import PlaylistEntry, PlaylistPager
+from .thumbnails import ThumbnailLoader, shared_loader
 
 
 class GradientFrame(tk.Canvas):
     def __init__(self, parent, **kwargs):
         super().__init__(parent, highlightthickness=0, bd=0, **kwargs)
         self._resize_id = None
+        # Keeps the displayed image alive if it falls out of the gradient cache.
+        self._photo: Optional[tk.PhotoImage] = None
         self.bind("<Configure>", self._on_resize)
 
     def _on_resize(self, event):
         if self._resize_id:
             self.after_cancel(self._resize_id)
-        self._resize_id = self.after(50, lambda: theme.draw_gradient(self, event.width, event.height))
+        self._resize_id = self.after(50, self._redraw, event.width, event.height)
+
+    def _redraw(self, width: int, height: int):
+        self._resize_id = None
+        self._photo = theme.draw_gradient(self, width, height)
 
 
 class ThumbnailPreview(tk.Label):
-    def __init__(self, parent, width=280, height=158, **kwargs):
+    def __init__(self, parent, width=280, height=158,
+                 loader: Optional[ThumbnailLoader] = None, **kwargs):
         super().__init__(parent, bg=theme.BG_CARD, fg=theme.TEXT_MUTED,
                          text="No thumbnail", font=theme.FONT_SMALL,
                          width=width // 8, height=height // 16, **kwargs)
         self._target_w = width
         self._target_h = height
         self._photo: Optional[tk.PhotoImage] = None
+        self._loader = loader
+        self._url: Optional[str] = None
 
     def load_url(self, url: str):
-        if not url:
+        if not url or (url == self._url and self._photo is not None):
+            return
+        self._url = url
+        loader = self._loader or shared_loader()
+        size = (self._target_w, self._target_h)
+        image = loader.get_cached(url, size)
+        if image is not None:
+            self._show(image)
             return
         self.configure(text="Loading...")
-        threading.Thread(target=self._fetch, args=(url,), daemon=True).start()
-
-    def _fetch(self, url: str):
-        try:
-            import urllib.request
-            req = urllib.request.Request(url, headers={"User-Agent": "StreamSniper/2.0"})
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                data = resp.read()
-            try:
-                from PIL import Image, ImageTk
-                img = Image.open(io.BytesIO(data))
-                img = img.resize((self._target_w, self._target_h), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-            except ImportError:
-                photo = tk.PhotoImage(data=data)
-                pw, ph = photo.width(), photo.height()
-                if pw > 0 and ph > 0:
-                    xscale = max(1, pw // self._target_w)
-                    yscale = max(1, ph // self._target_h)
-                    photo = photo.subsample(xscale, yscale)
-            self.after(0, self._set_image, photo)
-        except Exception:
-            self.after(0, lambda: self.configure(text="No thumbnail", image=""))
+        loader.load(url, size, lambda image: self.after(0, self._on_loaded, url, image))
+
+    def _on_loaded(self, url: str, image):
+        if url != self._url:
+            return  # a newer URL replaced this one while it was loading
+        if image is None:
+            self._photo = None
+            self.configure(text="No thumbnail", image="")
+            return
+        self._show(image)
+
+    def _show(self, image):
+        if isinstance(image, bytes):
+            photo = tk.PhotoImage(data=image)
+            pw, ph = photo.width(), photo.height()
+            if pw > 0 and ph > 0:
+                xscale = max(1, pw // self._target_w)
+                yscale = max(1, ph // self._target_h)
+                photo = photo.subsample(xscale, yscale)
+        else:
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(image)
+        self._set_image(photo)
 
     def _set_image(self, photo):
         self._photo = photo
         self.configure(image=photo, text="")
 
     def clear(self):
+        self._url = None
         self._photo = None
         self.configure(image="", text="No thumbnail")
 
 
+class PlaylistBrowser(ttk.Frame):
+    PAGE_SIZE = 50
+    THUMB_SIZE = (64, 36)
+    # Rows beyond the visible window that still get thumbnails.
+    THUMB_MARGIN = 10
+
+    def __init__(self, parent, loader: Optional[ThumbnailLoader] = None,
+                 on_select: Optional[Callable[[int], None]] = None, **kwargs):
+        super().__init__(parent, style="Card.TFrame", **kwargs)
+        self._loader = loader
+        self.on_select = on_select
+        self._pager: Optional[PlaylistPager] = None
+        self._entries: dict[str, PlaylistEntry] = {}
+        self._photos: dict[str, tk.PhotoImage] = {}
+        self._requested: set[str] = set()
+        self._loading = False
+        self._thumbs_after = None
+        # One thread pulls pages so the playlist iterator is never read concurrently.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playlist")
+
+        self.tree = ttk.Treeview(self, columns=("index", "title", "duration"),
+                                 show="tree headings", selectmode="extended",
+                                 style="Playlist.Treeview", height=5)
+        self.tree.heading("index", text="#")
+        self.tree.heading("title", text="Title")
+        self.tree.heading("duration", text="Duration")
+        self.tree.column("#0", width=self.THUMB_SIZE[0] + 16, stretch=False)
+        self.tree.column("index", width=44, minwidth=36, stretch=False, anchor=tk.E)
+        self.tree.column("title", width=380, minwidth=150)
+        self.tree.column("duration", width=70, minwidth=60, stretch=False)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self._selection_changed())
+
+    def show(self, pager: PlaylistPager):
+        self.clear()
+        self._pager = pager
+        self._load_more()
+
+    def clear(self):
+        if self._pager:
+            self._executor.submit(self._pager.close)
+        self._pager = None
+        self._loading = False
+        self.tree.delete(*self.tree.get_children())
+        self._entries.clear()
+        self._photos.clear()
+        self._requested.clear()
+        self._selection_changed()
+
+    def selected_entries(self) -> list[PlaylistEntry]:
+        return [self._entries[iid] for iid in self.tree.selection() if iid in self._entries]
+
+    def _selection_changed(self):
+        if self.on_select:
+            self.on_select(len(self.selected_entries()))
+
+    def _load_more(self):
+        pager = self._pager
+        if pager is None or pager.exhausted or self._loading:
+            return
+        self._loading = True
+        stop = len(self._entries) + self.PAGE_SIZE
+
+        def _fetch():
+            try:
+                entries, error = pager.fetch(stop), None
+            except Exception as e:
+                entries, error = [], str(e)
+            self.after(0, self._on_page, pager, entries, error)
+
+        self._executor.submit(_fetch)
+
+    def _on_page(self, pager: PlaylistPager, entries: list[PlaylistEntry], error: Optional[str]):
+        if pager is not self._pager:
+            return
+        self._loading = False
+        for entry in entries:
+            iid = str(entry.index)
+            self._entries[iid] = entry
+            self.tree.insert("", tk.END, iid=iid,
+                             values=(entry.index, entry.title[:80], entry.duration))
+        if error:
+            pager.exhausted = True
+            self.tree.insert("", tk.END, values=("", f"Could not load more: {error[:80]}", ""))
+        self._schedule_thumbnails()
+
+    def _on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        if float(last) >= 0.8:
+            self._load_more()
+        self._schedule_thumbnails()
+
+    def _schedule_thumbnails(self):
+        # Coalesce scroll bursts so thumbnails are only requested where the view settles.
+        if self._thumbs_after is not None:
+            self.after_cancel(self._thumbs_after)
+        self._thumbs_after = self.after(100, self._load_visible_thumbnails)
+
+    def _load_visible_thumbnails(self):
+        self._thumbs_after = None
+        rows = self.tree.get_children()
+        top = self.tree.identify_row(1)
+        bottom = self.tree.identify_row(self.tree.winfo_height() - 1)
+        if not rows or not top:
+            return
+        first = self.tree.index(top)
+        last = self.tree.index(bottom) if bottom else len(rows) - 1
+        lo, hi = max(0, first - self.THUMB_MARGIN), last + self.THUMB_MARGIN
+        window = set(rows[lo:hi + 1])
+        for iid in [iid for iid in self._photos if iid not in window]:
+            # Drop images that scrolled well out of view; the loader's cache keeps them cheap to restore.
+            del self._photos[iid]
+            self._requested.discard(iid)
+            self.tree.item(iid, image="")
+        loader = self._loader or shared_loader()
+        for iid in rows[lo:hi + 1]:
+            entry = self._entries.get(iid)
+            if entry is None or not entry.thumbnail_url or iid in self._requested:
+                continue
+            self._requested.add(iid)
+            pager = self._pager
+            loader.load(entry.thumbnail_url, self.THUMB_SIZE,
+                        lambda image, iid=iid: self.after(0, self._set_thumbnail, pager, iid, image))
+
+    def _set_thumbnail(self, pager: PlaylistPager, iid: str, image):
+        if pager is not self._pager or iid not in self._requested or image is None:
+            return
+        if isinstance(image, bytes):
+            photo = tk.PhotoImage(data=image)
+            photo = photo.subsample(max(1, photo.width() // self.THUMB_SIZE[0]),
+                                    max(1, photo.height() // self.THUMB_SIZE[1]))
+        else:
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(image)
+        self._photos[iid] = photo
+        self.tree.item(iid, image=photo)
+
+
 class StatusBar(ttk.Frame):
     def __init__(self, parent, **kwargs):
         super().__init__(parent, style="Card.TFrame", **kwargs)
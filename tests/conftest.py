@@ -0,0 +1,36 @@
+import pytest
+
+from streamsniper.downloader import DownloadProgress, DownloadState, RawDownload
+
+
+class StubDownloader:
+    cache = None
+
+    class pool:
+        max_idle = 4
+
+    def __init__(self):
+        self.fetched: list[str] = []
+
+    def resolve(self, url, fmt="video", quality="best"):
+        return {}
+
+    def fetch(self, url, output_dir, progress_callback=None, cancel_event=None, **kwargs):
+        # URLs ending in "/hold" run until cancelled; others finish after a few updates.
+        self.fetched.append(url)
+        for i in range(1000 if url.endswith("/hold") else 5):
+            if cancel_event.wait(0.02):
+                return None
+            progress_callback(DownloadProgress(state=DownloadState.DOWNLOADING, percent=i * 10))
+        return RawDownload(f"{output_dir}/out.mp4", {"id": "x", "title": "Stub"})
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    # Keeps history, archive and journal files out of the real config directory.
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+
+
+@pytest.fixture
+def downloader():
+    return StubDownloader()
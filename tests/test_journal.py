@@ -0,0 +1,115 @@
+import time
+
+from streamsniper.archive import DownloadArchive
+from streamsniper.downloader import DownloadManager, DownloadState, PlaylistEntry
+from streamsniper.journal import QueueJournal
+
+_SPEC = dict(title="", output_dir="/tmp", fmt="video", quality="best", audio_format="mp3",
+             embed_thumbnail=True, sponsorblock=False)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_replay_returns_unfinished_tasks(tmp_path):
+    journal = QueueJournal(tmp_path / "queue.journal")
+    for task_id in ("a", "b", "c", "d"):
+        journal.enqueue(task_id, dict(_SPEC, url=f"https://stub.test/{task_id}"))
+    journal.state("a", "DOWNLOADING")
+    journal.state("b", "COMPLETE", "/tmp/b.mp4")
+    journal.state("c", "CANCELLED")
+    journal.close()
+    with open(tmp_path / "queue.journal", "a") as f:
+        f.write('{"op":"state","task_id":"d","sta')  # torn by a crash mid-write
+
+    tasks, playlists = QueueJournal(tmp_path / "queue.journal").replay()
+    assert [t["task_id"] for t in tasks] == ["a", "d"]
+    assert tasks[0]["url"] == "https://stub.test/a"
+    assert playlists == []
+
+
+def test_compact_keeps_pending_work_and_skip_counts(tmp_path):
+    path = tmp_path / "queue.journal"
+    journal = QueueJournal(path)
+    journal.playlist("p", "https://stub.test/list", {k: v for k, v in _SPEC.items() if k != "title"})
+    journal.playlist_skipped("p", 3)
+    journal.enqueue("a", dict(_SPEC, url="https://stub.test/a"), playlist_id="p")
+    journal.enqueue("b", dict(_SPEC, url="https://stub.test/b"), playlist_id="p")
+    journal.state("a", "COMPLETE")
+    journal.enqueue("x", dict(_SPEC, url="https://stub.test/x"))
+    journal.playlist("done", "https://stub.test/other", {})
+    journal.playlist_done("done")
+
+    tasks, playlists = journal.replay()
+    assert [t["task_id"] for t in tasks] == ["b", "x"]
+    assert [(p["playlist_id"], p["ingested"]) for p in playlists] == [("p", 5)]
+
+    journal.compact(tasks, playlists)
+    assert len(path.read_text().splitlines()) == 3
+    # Appends after compaction land in the new file.
+    journal.state("b", "ERROR")
+    journal.close()
+
+    tasks, playlists = QueueJournal(path).replay()
+    assert [t["task_id"] for t in tasks] == ["x"]
+    assert [(p["playlist_id"], p["ingested"]) for p in playlists] == [("p", 5)]
+
+
+def test_restore_requeues_interrupted_tasks(tmp_path, downloader):
+    path = tmp_path / "queue.journal"
+    dm = DownloadManager(downloader=downloader, lookahead=0, journal=QueueJournal(path))
+    held = dm.enqueue("https://stub.test/hold", str(tmp_path))
+    done = dm.enqueue("https://stub.test/done", str(tmp_path))
+    _wait_for(lambda: dm.queue_item(done).state is DownloadState.COMPLETE)
+    dm.shutdown()
+
+    dm = DownloadManager(downloader=downloader, lookahead=0, journal=QueueJournal(path))
+    try:
+        assert dm.restore() == 1
+        assert [item.task_id for item in dm.queue_snapshot()] == [held]
+        _wait_for(lambda: dm.queue_item(held).state is DownloadState.DOWNLOADING)
+    finally:
+        dm.shutdown()
+
+
+def test_archived_playlist_entries_are_counted_as_ingested(tmp_path, downloader):
+    entries = [PlaylistEntry(f"https://stub.test/{i}", str(i), video_key=f"stub {i}")
+               for i in range(5)]
+    downloader.iter_playlist = lambda url: iter(entries)
+    archive = DownloadArchive(tmp_path / "history.db")
+    archive.add(["stub 0", "stub 1", "stub 3"])
+    journal = QueueJournal(tmp_path / "queue.journal")
+    dm = DownloadManager(downloader=downloader, lookahead=0, journal=journal,
+                         archive=archive, max_backlog=1)
+    progress = []
+    dm.on_playlist_progress = lambda *args: progress.append(args)
+    try:
+        playlist_id = dm.enqueue_playlist("https://stub.test/list", str(tmp_path))
+        _wait_for(lambda: progress and progress[-1][3])
+        assert progress[-1] == (playlist_id, 2, 3, True)
+        assert sorted(downloader.fetched) == ["https://stub.test/2", "https://stub.test/4"]
+    finally:
+        dm.shutdown()
+
+
+def test_interrupted_playlist_resumes_after_skipped_entries(tmp_path, downloader):
+    # 0 and 2 are archived; 1 downloads, 3 waits in the backlog and 4 waits for room.
+    entries = [PlaylistEntry(f"https://stub.test/{i}/hold", str(i), video_key=f"stub {i}")
+               for i in range(5)]
+    downloader.iter_playlist = lambda url: iter(entries)
+    archive = DownloadArchive(tmp_path / "history.db")
+    archive.add(["stub 0", "stub 2"])
+    path = tmp_path / "queue.journal"
+    dm = DownloadManager(max_workers=1, downloader=downloader, lookahead=0,
+                         journal=QueueJournal(path), archive=archive, max_backlog=1)
+    playlist_id = dm.enqueue_playlist("https://stub.test/list", str(tmp_path))
+    _wait_for(lambda: len(dm.queue_snapshot()) == 2)
+    dm.shutdown()
+
+    tasks, playlists = QueueJournal(path).replay()
+    assert sorted(t["url"] for t in tasks) == ["https://stub.test/1/hold", "https://stub.test/3/hold"]
+    assert [(p["playlist_id"], p["ingested"]) for p in playlists] == [(playlist_id, 4)]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+
+from streamsniper.downloader import DownloadManager
+from streamsniper.server import JobServer
+
+
+async def _request(port, method, path, body=None, extra=""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n{extra}"
+                 f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+                 .encode() + data)
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.decode().partition("\r\n\r\n")
+    return int(head.split()[1]), payload
+
+
+async def _events(port, path):
+    status, payload = await _request(port, "GET", path)
+    events = []
+    for block in payload.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return status, events
+
+
+def test_job_lifecycle(tmp_path, downloader):
+    dm = DownloadManager(downloader=downloader, lookahead=0)
+
+    async def run():
+        server = JobServer(dm, defaults={"output_dir": str(tmp_path)}, progress_hz=50)
+        await server.start(port=0)
+        port = server.port
+        try:
+            status, body = await _request(port, "POST", "/jobs", {"url": "http://stub.test/a"})
+            assert status == 201
+            task_id = json.loads(body)["task_id"]
+
+            status, events = await asyncio.wait_for(
+                _events(port, f"/jobs/{task_id}/events"), timeout=10)
+            assert status == 200
+            assert events[-1][0] == "complete"
+            assert events[-1][1]["path"] == f"{tmp_path}/out.mp4"
+
+            status, body = await _request(port, "GET", f"/jobs/{task_id}")
+            assert status == 200 and json.loads(body)["state"] == "complete"
+
+            status, body = await _request(port, "POST", "/jobs", {"url": "http://stub.test/hold"})
+            held = json.loads(body)["task_id"]
+            status, body = await _request(port, "GET", "/jobs")
+            assert {job["task_id"] for job in json.loads(body)} == {task_id, held}
+
+            stream = asyncio.ensure_future(_events(port, f"/jobs/{held}/events"))
+            await asyncio.sleep(0.2)
+            status, _ = await _request(port, "DELETE", f"/jobs/{held}")
+            assert status == 202
+            _, events = await asyncio.wait_for(stream, timeout=10)
+            assert events[-1][1]["state"] == "cancelled"
+
+            status, _ = await _request(port, "GET", "/jobs/missing")
+            assert status == 404
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        dm.shutdown()
+    assert not [t for t in threading.enumerate() if t.name.startswith("asyncio")]
+
+
+def test_oversized_header(tmp_path, downloader):
+    dm = DownloadManager(downloader=downloader, lookahead=0)
+
+    async def run():
+        server = JobServer(dm, defaults={"output_dir": str(tmp_path)})
+        await server.start(port=0)
+        try:
+            status, _ = await _request(server.port, "GET", "/jobs",
+                                       extra=f"X-Padding: {'a' * 100_000}\r\n")
+            assert status == 431
+            status, _ = await _request(server.port, "GET", "/jobs")
+            assert status == 200
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    finally:
+        dm.shutdown()
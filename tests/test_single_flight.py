@@ -0,0 +1,67 @@
+import time
+
+from streamsniper.downloader import DownloadManager, DownloadState
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _state(dm, task_id):
+    return dm.queue_item(task_id).state
+
+
+def test_duplicates_share_one_transfer(tmp_path, downloader):
+    dm = DownloadManager(downloader=downloader, lookahead=0)
+    try:
+        first = dm.enqueue("https://stub.test/v", str(tmp_path))
+        second = dm.enqueue("https://www.stub.test/v/", str(tmp_path))
+        other_dir = dm.enqueue("https://stub.test/v", str(tmp_path / "other"))
+        _wait_for(lambda: all(_state(dm, t) is DownloadState.COMPLETE
+                              for t in (first, second, other_dir)))
+        # The second URL normalizes to the first; a different directory is its own transfer.
+        assert len(downloader.fetched) == 2
+    finally:
+        dm.shutdown()
+
+
+def test_cancelling_a_subscriber_leaves_the_transfer_running(tmp_path, downloader):
+    dm = DownloadManager(downloader=downloader, lookahead=0)
+    try:
+        leader = dm.enqueue("https://stub.test/hold", str(tmp_path))
+        subscriber = dm.enqueue("https://stub.test/hold", str(tmp_path))
+        _wait_for(lambda: _state(dm, subscriber) is DownloadState.DOWNLOADING)
+
+        dm.cancel(subscriber)
+        assert _state(dm, subscriber) is DownloadState.CANCELLED
+        time.sleep(0.1)
+        assert _state(dm, leader) is DownloadState.DOWNLOADING
+        assert dm.active_tasks() == [leader]
+
+        dm.cancel(leader)
+        _wait_for(lambda: _state(dm, leader) is DownloadState.CANCELLED)
+        assert downloader.fetched == ["https://stub.test/hold"]
+    finally:
+        dm.shutdown()
+
+
+def test_cancelling_the_leader_keeps_it_running_for_subscribers(tmp_path, downloader):
+    dm = DownloadManager(downloader=downloader, lookahead=0)
+    try:
+        leader = dm.enqueue("https://stub.test/hold", str(tmp_path))
+        subscriber = dm.enqueue("https://stub.test/hold", str(tmp_path))
+        _wait_for(lambda: _state(dm, leader) is DownloadState.DOWNLOADING)
+
+        dm.cancel(leader)
+        assert _state(dm, leader) is DownloadState.CANCELLED
+        time.sleep(0.1)
+        assert _state(dm, subscriber) is DownloadState.DOWNLOADING
+
+        dm.cancel(subscriber)
+        _wait_for(lambda: _state(dm, subscriber) is DownloadState.CANCELLED)
+        _wait_for(dm.is_idle)
+    finally:
+        dm.shutdown()
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from streamsniper import throttle
+from streamsniper.throttle import ErrorKind, HostThrottle, classify_error
+
+
+class GeoRestrictedError(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP Error {status}")
+        self.status = status
+
+
+class DownloadError(Exception):
+    # yt-dlp keeps the underlying error in exc_info rather than __cause__.
+    def __init__(self, message, cause=None):
+        super().__init__(message)
+        self.exc_info = (type(cause), cause, None) if cause else None
+
+
+class TransportError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, kind", [
+    (GeoRestrictedError("whatever"), ErrorKind.GEO_BLOCKED),
+    (DownloadError("ERROR: unable to download", HTTPError(429)), ErrorKind.THROTTLED),
+    (HTTPError(403), ErrorKind.THROTTLED),
+    (HTTPError(404), ErrorKind.UNAVAILABLE),
+    (HTTPError(503), ErrorKind.TRANSIENT),
+    (Exception("The uploader has not made this video available in your country"),
+     ErrorKind.GEO_BLOCKED),
+    (Exception("Video unavailable. This video is private"), ErrorKind.UNAVAILABLE),
+    # A removed video that also got a 403 message is still not worth retrying.
+    (Exception("HTTP Error 403: video has been removed"), ErrorKind.UNAVAILABLE),
+    (Exception("Sign in to confirm you're not a bot"), ErrorKind.THROTTLED),
+    (Exception("Read timed out"), ErrorKind.TRANSIENT),
+    (DownloadError("ERROR: download failed", TransportError("boom")), ErrorKind.TRANSIENT),
+    (ValueError("something else"), ErrorKind.UNKNOWN),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) is kind
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_throttled_host_halves_concurrency_and_doubles_delay(clock):
+    t = HostThrottle(max_per_host=8, min_delay=1.0)
+    t.record("a.test", ErrorKind.THROTTLED)
+    assert t.limit("a.test") == 4
+    assert t.ready_at("a.test") == 1001.0
+
+    # Reports from transfers caught in the same episode are counted once.
+    t.record("a.test", ErrorKind.THROTTLED)
+    assert t.limit("a.test") == 4
+
+    clock[0] += 1.5
+    t.record("a.test", ErrorKind.THROTTLED)
+    assert t.limit("a.test") == 2
+    assert t.ready_at("a.test") == 1003.5
+
+    # Only throttling lowers the limit, and other hosts are unaffected.
+    t.record("a.test", ErrorKind.TRANSIENT)
+    assert t.limit("a.test") == 2
+    assert t.limit("b.test") == 8
+
+
+def test_successes_restore_the_host(clock):
+    t = HostThrottle(max_per_host=4, min_delay=1.0)
+    t.record("a.test", ErrorKind.THROTTLED)
+    assert t.limit("a.test") == 2
+    t.started("a.test")
+    assert t.ready_at("a.test") == 1001.0
+
+    # Additive increase: each success adds 1/limit, about one slot per window of
+    # successes, and trims the delay by min_delay.
+    limits = []
+    for _ in range(6):
+        t.success("a.test")
+        limits.append(t.limit("a.test"))
+    assert limits == [2, 2, 3, 3, 3, 4]
+    # Back at the maximum with no delay, the host is forgotten.
+    assert t.ready_at("a.test") == 0.0
+    assert "a.test" not in t._hosts
+
+
+def test_lowering_the_maximum_caps_throttled_hosts(clock):
+    t = HostThrottle(max_per_host=8)
+    t.record("a.test", ErrorKind.THROTTLED)
+    t.set_max_per_host(2)
+    assert t.limit("a.test") == 2
+    assert t.limit("b.test") == 2